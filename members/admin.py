@@ -1,35 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db.models.expressions import RawSQL
 from django.http import JsonResponse
 from django.urls import path
 from django import forms
 from .models import User
 from .location_models import City, District, Neighborhood
-import locale
-
-
-# Turkish alphabetical ordering function
-def turkish_sort_key(text):
-    """Convert Turkish characters for proper alphabetical sorting"""
-    if not text:
-        return ''
-    
-    # Turkish alphabet order mapping - correct order: C before Ç, S before Ş
-    turkish_order = {
-        'a': 'a', 'b': 'b', 'c': 'c', 'ç': 'c~', 'd': 'd', 'e': 'e', 'f': 'f',
-        'g': 'g', 'ğ': 'g~', 'h': 'h', 'ı': 'i', 'i': 'i~', 'j': 'j', 'k': 'k',
-        'l': 'l', 'm': 'm', 'n': 'n', 'o': 'o', 'ö': 'o~', 'p': 'p', 'r': 'r',
-        's': 's', 'ş': 's~', 't': 't', 'u': 'u', 'ü': 'u~', 'v': 'v', 'y': 'y', 'z': 'z',
-        'A': 'a', 'B': 'b', 'C': 'c', 'Ç': 'c~', 'D': 'd', 'E': 'e', 'F': 'f',
-        'G': 'g', 'Ğ': 'g~', 'H': 'h', 'I': 'i', 'İ': 'i~', 'J': 'j', 'K': 'k',
-        'L': 'l', 'M': 'm', 'N': 'n', 'O': 'o', 'Ö': 'o~', 'P': 'p', 'R': 'r',
-        'S': 's', 'Ş': 's~', 'T': 't', 'U': 'u', 'Ü': 'u~', 'V': 'v', 'Y': 'y', 'Z': 'z'
-    }
-    
-    result = ''
-    for char in text.lower():
-        result += turkish_order.get(char, char)
-    return result
+from .location_cache import get_location_tree
+from .member_search import matching_ids_sql, query_terms, search_supported
 
 
 class CustomUserAdmin(UserAdmin):
@@ -37,6 +15,15 @@ class CustomUserAdmin(UserAdmin):
     list_filter = ('role', 'city', 'ilce', 'is_staff', 'created_at')
     search_fields = ('email', 'first_name', 'last_name', 'city', 'ilce', 'mahalle', 'finansal_kod_numarasi')
     ordering = ('email',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Also find users by their profile texts, through the full-text index (SQLite)."""
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        terms = query_terms(search_term)
+        if terms and search_supported():
+            sql, params = matching_ids_sql(terms)
+            results |= queryset.filter(id__in=RawSQL(sql, params))
+        return results, may_have_duplicates
     
     def formfield_for_dbfield(self, db_field, request, **kwargs):
         from django import forms
@@ -52,11 +39,9 @@ class CustomUserAdmin(UserAdmin):
             kwargs['label'] = 'Şehir'
             # Get the default field first
             field = super().formfield_for_dbfield(db_field, request, **kwargs)
-            # Get all cities and sort them properly
-            cities = City.objects.all()
-            sorted_cities = sorted(cities, key=lambda x: turkish_sort_key(x.name))
+            # Cities come from the location tree, already in Turkish order
             choices = [('', 'Şehir seçin')]
-            choices.extend([(city.name, city.name) for city in sorted_cities])
+            choices.extend([(name, name) for name in get_location_tree().city_names])
             # Update the widget with choices and onchange event
             field.widget = forms.Select(
                 choices=choices,
@@ -75,11 +60,9 @@ class CustomUserAdmin(UserAdmin):
                     user_id = request.resolver_match.kwargs['object_id']
                     user = User.objects.get(pk=user_id)
                     if user.city:
-                        city = City.objects.get(name=user.city)
-                        districts = District.objects.filter(city=city)
-                        sorted_districts = sorted(districts, key=lambda x: turkish_sort_key(x.name))
-                        choices.extend([(d.name, d.name) for d in sorted_districts])
-                except (User.DoesNotExist, City.DoesNotExist):
+                        districts = get_location_tree().districts(user.city) or ()
+                        choices.extend([(name, name) for name in districts])
+                except User.DoesNotExist:
                     pass
             
             field.widget = forms.Select(
@@ -99,12 +82,9 @@ class CustomUserAdmin(UserAdmin):
                     user_id = request.resolver_match.kwargs['object_id']
                     user = User.objects.get(pk=user_id)
                     if user.city and user.ilce:
-                        city = City.objects.get(name=user.city)
-                        district = District.objects.get(name=user.ilce, city=city)
-                        neighborhoods = Neighborhood.objects.filter(district=district)
-                        sorted_neighborhoods = sorted(neighborhoods, key=lambda x: turkish_sort_key(x.name))
-                        choices.extend([(n.name, n.name) for n in sorted_neighborhoods])
-                except (User.DoesNotExist, City.DoesNotExist, District.DoesNotExist):
+                        neighborhoods = get_location_tree().neighborhoods(user.city, user.ilce) or ()
+                        choices.extend([(name, name) for name in neighborhoods])
+                except User.DoesNotExist:
                     pass
             
             field.widget = forms.Select(
@@ -155,7 +135,7 @@ class CustomUserAdmin(UserAdmin):
 class CityAdmin(admin.ModelAdmin):
     list_display = ('name', 'created_at')
     search_fields = ('name',)
-    ordering = ('name',)
+    ordering = ('sort_key', 'name')
 
 
 @admin.register(District)
@@ -163,7 +143,7 @@ class DistrictAdmin(admin.ModelAdmin):
     list_display = ('name', 'city', 'created_at')
     list_filter = ('city',)
     search_fields = ('name', 'city__name')
-    ordering = ('city__name', 'name')
+    ordering = ('city__sort_key', 'sort_key')
 
 
 @admin.register(Neighborhood)
@@ -171,7 +151,7 @@ class NeighborhoodAdmin(admin.ModelAdmin):
     list_display = ('name', 'district', 'city', 'created_at')
     list_filter = ('district__city',)
     search_fields = ('name', 'district__name', 'district__city__name')
-    ordering = ('district__city__name', 'district__name', 'name')
+    ordering = ('district__city__sort_key', 'district__sort_key', 'sort_key')
     
     def city(self, obj):
         return obj.district.city.name
@@ -187,18 +167,14 @@ def get_districts_view(request):
     print(f"Getting districts for city: {city_name}")
     
     if city_name:
-        try:
-            city = City.objects.get(name=city_name)
-            districts = District.objects.filter(city=city)
-            print(f"Found {districts.count()} districts for {city_name}")
-            
-            # Sort districts using Turkish alphabetical order
-            sorted_districts = sorted(districts, key=lambda x: turkish_sort_key(x.name))
+        # Districts come from the location tree, already in Turkish order
+        districts = get_location_tree().districts(city_name)
+        if districts is not None:
+            print(f"Found {len(districts)} districts for {city_name}")
             data = {
-                'districts': [{'name': d.name, 'value': d.name} for d in sorted_districts]
+                'districts': [{'name': name, 'value': name} for name in districts]
             }
-            print(f"Returning districts: {[d.name for d in sorted_districts]}")
-        except City.DoesNotExist:
+        else:
             print(f"City '{city_name}' not found")
             data = {'districts': []}
     else:
@@ -214,20 +190,15 @@ def get_neighborhoods_view(request):
     print(f"Getting neighborhoods for district: {district_name} in city: {city_name}")
     
     if city_name and district_name:
-        try:
-            city = City.objects.get(name=city_name)
-            district = District.objects.get(name=district_name, city=city)
-            neighborhoods = Neighborhood.objects.filter(district=district)
-            print(f"Found {neighborhoods.count()} neighborhoods for {district_name}")
-            
-            # Sort neighborhoods using Turkish alphabetical order
-            sorted_neighborhoods = sorted(neighborhoods, key=lambda x: turkish_sort_key(x.name))
+        # Neighborhoods come from the location tree, already in Turkish order
+        neighborhoods = get_location_tree().neighborhoods(city_name, district_name)
+        if neighborhoods is not None:
+            print(f"Found {len(neighborhoods)} neighborhoods for {district_name}")
             data = {
-                'neighborhoods': [{'name': n.name, 'value': n.name} for n in sorted_neighborhoods]
+                'neighborhoods': [{'name': name, 'value': name} for name in neighborhoods]
             }
-            print(f"Returning neighborhoods: {[n.name for n in sorted_neighborhoods[:5]]}...")  # Show first 5
-        except (City.DoesNotExist, District.DoesNotExist) as e:
-            print(f"Error: {e}")
+        else:
+            print(f"District '{district_name}' not found in '{city_name}'")
             data = {'neighborhoods': []}
     else:
         print("Missing city or district name")
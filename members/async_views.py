@@ -0,0 +1,357 @@
+# members/async_views.py
+"""
+Async variants of the read-heavy endpoints, for ASGI deployments.
+
+DRF views are synchronous, so under ``saha_api/asgi.py`` every request to them
+is handed to a worker thread. The views here are native Django async views:
+the location endpoints answer from the cached tree on the event loop (file
+reads and cold encodes go to a thread), and the member endpoints use the
+async ORM. They return the same JSON
+bodies, status codes and cache headers as their DRF counterparts and are
+routed under ``/api/async/``.
+"""
+from calendar import timegm
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, status
+from rest_framework.authentication import get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+
+from .authentication import EXPIRED_MESSAGE, cached_token, remember_token, token_expires_in
+from .fast_json import dumps
+from .location_cache import aget_location_tree, aget_location_version
+from .location_payloads import ALL_LOCATIONS, districts_name, read_precompressed
+from .location_search import get_search_index, search_index_ready, format_result
+from .location_views import (
+    PRECOMPRESSED_VARY, SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT,
+    location_etag, patch_location_cache_headers,
+)
+from .member_rollup import amap_counts
+from .middleware import get_user
+from .models import MemberLocationRollup, User
+from .representations import PROFILE
+from .views import (
+    MAP_MEMBER_FIELDS, group_map_members,
+    representation_etag, representation_headers, representation_key,
+)
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    """JSON response rendered like FastJSONRenderer (compact UTF-8)."""
+    return HttpResponse(dumps(data), status=status, content_type='application/json; charset=utf-8')
+
+
+def require_get(view):
+    """Async counterpart of @api_view(['GET']): 405 for anything but GET/HEAD."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET'])
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def alocation_cache_headers(view=None, vary=()):
+    """
+    Async counterpart of ``location_cache_headers``.
+
+    Answers conditional requests with 304 from the version stamp before the
+    view runs, then adds ETag / Last-Modified / Cache-Control to 200s.
+    """
+    if view is None:
+        return partial(alocation_cache_headers, vary=vary)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        version, updated_at = await aget_location_version()
+        etag = location_etag(request, version, vary)
+        last_modified = timegm(updated_at.utctimetuple()) if updated_at else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await view(request, *args, **kwargs)
+        return patch_location_cache_headers(response, etag, last_modified, vary)
+    return require_get(wrapper)
+
+
+async def aprecompressed_or(request, tree, name, build_response):
+    """
+    Async counterpart of ``precompressed_or``.
+
+    The file is read in a worker thread and served from memory: a
+    FileResponse would block the event loop on every chunk it reads.
+    """
+    found = await sync_to_async(read_precompressed, thread_sensitive=False)(request, tree.version, name)
+    if found is not None:
+        coding, body = found
+        response = HttpResponse(body, content_type='application/json; charset=utf-8')
+        response['Content-Encoding'] = coding
+    else:
+        response = await build_response()
+    patch_vary_headers(response, PRECOMPRESSED_VARY)
+    return response
+
+
+def auth_error_response(request, exc):
+    """
+    DRF's response for a NotAuthenticated / AuthenticationFailed: the
+    ``{"detail": ...}`` body, and 401 with a challenge only when the first
+    authentication class has one (SessionAuthentication has none, so 403).
+    """
+    response = json_response({'detail': str(exc.detail)}, status=exc.status_code)
+    authenticate_header = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]().authenticate_header(request)
+    if authenticate_header:
+        response['WWW-Authenticate'] = authenticate_header
+    else:
+        response.status_code = status.HTTP_403_FORBIDDEN
+    return response
+
+
+async def aget_request_user(request):
+    """
+    The user DRF's SessionAuthentication or CachedTokenAuthentication would
+    authenticate, in the same order, or None for an anonymous request.
+
+    A bad, expired or inactive user's token raises AuthenticationFailed with
+    DRF's messages. Tokens come from the same cache as
+    ``CachedTokenAuthentication`` and are otherwise looked up with the async
+    ORM. Django's session and auth APIs are sync-only in this version, so the
+    session user is loaded in a thread (through the same cache as
+    ``CachedAuthenticationMiddleware``), and only when a session cookie is
+    sent.
+    """
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        user = await sync_to_async(get_user)(request)
+        if user.is_active:
+            return user
+
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b'token':
+        return None
+    if len(auth) == 1:
+        raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+    if len(auth) > 2:
+        raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise exceptions.AuthenticationFailed(
+            _('Invalid token header. Token string should not contain invalid characters.'))
+
+    token = cached_token(key)
+    cached = token is not None
+    if not cached:
+        token = await Token.objects.select_related('user').filter(key=key).afirst()
+        if token is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+    remaining = token_expires_in(token)
+    if remaining is not None and remaining <= 0:
+        await token.adelete()
+        raise exceptions.AuthenticationFailed(EXPIRED_MESSAGE)
+
+    if not cached:
+        remember_token(token)
+    return token.user
+
+
+@require_get
+async def auser_profile(request):
+    """Async user_profile"""
+    try:
+        user = await aget_request_user(request)
+        if user is None:
+            raise exceptions.NotAuthenticated()
+    except exceptions.APIException as exc:
+        return auth_error_response(request, exc)
+    etag = representation_etag('profile', user)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        key = representation_key('profile', user)
+        data = await cache.aget(key)
+        if data is None:
+            data = PROFILE.instance(user)
+            await cache.aset(key, data, getattr(settings, 'PROFILE_CACHE_TIMEOUT', 3600))
+        response = json_response(data)
+    return representation_headers(response, etag)
+
+
+@require_get
+async def aget_users_by_city(request):
+    """Async get_users_by_city (both the full list and ?mode=counts)"""
+    try:
+        if request.GET.get('mode') == 'counts':
+            counts = await amap_counts(MemberLocationRollup)
+            return json_response({
+                'success': True,
+                'mode': 'counts',
+                'data': counts,
+                'total_cities': len(counts),
+                'total_users': sum(counts.values())
+            })
+
+        users = [user async for user in User.objects.filter(is_active=True).values(*MAP_MEMBER_FIELDS)]
+        city_users = group_map_members(users)
+        return json_response({
+            'success': True,
+            'data': city_users,
+            'total_cities': len(city_users),
+            'total_users': sum(len(users) for users in city_users.values())
+        })
+
+    except Exception as e:
+        return json_response({
+            'success': False,
+            'error': 'Kullanıcı verileri alınırken hata oluştu'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@alocation_cache_headers
+async def aget_cities(request):
+    """Async get_cities"""
+    tree = await aget_location_tree()
+    return json_response({
+        'success': True,
+        'cities': tree.city_names
+    })
+
+
+@alocation_cache_headers(vary=PRECOMPRESSED_VARY)
+async def aget_districts(request, city_name):
+    """Async get_districts"""
+    tree = await aget_location_tree()
+    districts = tree.districts(city_name)
+    if districts is None:
+        return json_response({
+            'success': False,
+            'error': 'Şehir bulunamadı'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    async def build_response():
+        return json_response({
+            'success': True,
+            'city': city_name,
+            'districts': districts
+        })
+
+    return await aprecompressed_or(request, tree, districts_name(city_name), build_response)
+
+
+@alocation_cache_headers
+async def aget_neighborhoods(request, city_name, district_name):
+    """Async get_neighborhoods"""
+    tree = await aget_location_tree()
+    if not tree.has_city(city_name):
+        return json_response({
+            'success': False,
+            'error': 'Şehir bulunamadı'
+        }, status=status.HTTP_404_NOT_FOUND)
+    neighborhoods = tree.neighborhoods(city_name, district_name)
+    if neighborhoods is None:
+        return json_response({
+            'success': False,
+            'error': 'İlçe bulunamadı'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return json_response({
+        'success': True,
+        'city': city_name,
+        'district': district_name,
+        'neighborhoods': neighborhoods
+    })
+
+
+@alocation_cache_headers(vary=PRECOMPRESSED_VARY)
+async def aget_all_locations(request):
+    """Async get_all_locations"""
+    tree = await aget_location_tree()
+
+    async def build_response():
+        if tree.all_locations_json_ready():
+            body = tree.all_locations_json()
+        else:
+            # Encoding the whole tree takes a while; keep it off the event loop
+            body = await sync_to_async(tree.all_locations_json)()
+        return HttpResponse(body, content_type='application/json; charset=utf-8')
+
+    return await aprecompressed_or(request, tree, ALL_LOCATIONS, build_response)
+
+
+@alocation_cache_headers
+async def asearch_locations(request):
+    """Async search_locations"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return json_response({
+            'success': False,
+            'error': 'Arama metni (q) gereklidir'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = int(request.GET.get('limit', SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        limit = SEARCH_DEFAULT_LIMIT
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+    tree = await aget_location_tree()
+    if search_index_ready(tree):
+        index = get_search_index(tree)
+    else:
+        # Building the index takes a while; keep it off the event loop
+        index = await sync_to_async(get_search_index)(tree)
+    return json_response({
+        'success': True,
+        'query': query,
+        'results': [format_result(entry) for entry in index.search(query, limit)]
+    })
+
+
+@alocation_cache_headers
+async def aget_cities_v2(request):
+    """Async get_cities_v2"""
+    tree = await aget_location_tree()
+    return json_response({
+        'success': True,
+        'cities': tree.city_rows
+    })
+
+
+@alocation_cache_headers
+async def aget_districts_v2(request, city_id):
+    """Async get_districts_v2"""
+    districts = (await aget_location_tree()).district_rows(city_id)
+    if districts is None:
+        return json_response({
+            'success': False,
+            'error': 'Şehir bulunamadı'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return json_response({
+        'success': True,
+        'city_id': city_id,
+        'districts': districts
+    })
+
+
+@alocation_cache_headers
+async def aget_neighborhoods_v2(request, district_id):
+    """Async get_neighborhoods_v2"""
+    neighborhoods = (await aget_location_tree()).neighborhood_rows(district_id)
+    if neighborhoods is None:
+        return json_response({
+            'success': False,
+            'error': 'İlçe bulunamadı'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return json_response({
+        'success': True,
+        'district_id': district_id,
+        'neighborhoods': neighborhoods
+    })
@@ -0,0 +1,71 @@
+# members/authentication.py
+"""
+Token authentication without a token/user query on every request.
+
+``CachedTokenAuthentication`` wraps DRF's ``TokenAuthentication`` with the
+``token_users`` cache from ``members/user_cache.py``. Deleting a token or
+saving its user drops the cached entry (``members/signals.py``), but only in
+the process that did it: the others keep accepting a deleted token, or a
+deactivated user's token, until their entry expires after
+``AUTH_TOKEN_CACHE_TTL`` seconds. That TTL is kept short for this reason.
+
+With ``AUTH_TOKEN_EXPIRY`` set, tokens older than that many seconds are
+rejected and deleted, and no token is cached past its expiry.
+"""
+import copy
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .user_cache import token_users
+
+EXPIRED_MESSAGE = _('Token has expired.')
+
+
+def token_expires_in(token):
+    """Seconds until ``token`` expires, or None when tokens do not expire."""
+    expiry = getattr(settings, 'AUTH_TOKEN_EXPIRY', None)
+    if not expiry:
+        return None
+    return (token.created + timedelta(seconds=expiry) - timezone.now()).total_seconds()
+
+
+def cached_token(key):
+    """Token for ``key`` (with its user) from the cache, or None."""
+    hit = token_users.get(key)
+    if hit is None:
+        return None
+    token = hit[1]
+    token.user = copy.copy(token.user)
+    return token
+
+
+def remember_token(token):
+    token_users.set(token.key, token.user_id, None, token, ttl=token_expires_in(token))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication answered from ``token_users`` when possible."""
+
+    def authenticate_credentials(self, key):
+        token = cached_token(key)
+        if token is None:
+            _user, token = super().authenticate_credentials(key)
+            cached = False
+        else:
+            cached = True
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        remaining = token_expires_in(token)
+        if remaining is not None and remaining <= 0:
+            token.delete()
+            raise exceptions.AuthenticationFailed(EXPIRED_MESSAGE)
+
+        if not cached:
+            remember_token(token)
+        return token.user, token
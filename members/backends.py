@@ -0,0 +1,85 @@
+# members/backends.py
+"""
+Email/password authentication with a single user lookup.
+
+Password hashing (PBKDF2 by default) is the expensive part of a login. At
+most ``PASSWORD_HASH_WORKERS`` logins hash at the same time per process, so a
+burst of logins cannot occupy more cores than that. The hash runs in the
+calling thread: DRF views are synchronous and already run in a worker
+thread under ASGI, so there is no event loop to keep it off.
+
+Unknown emails are checked against a dummy hash of the same algorithm, so a
+failed login takes as long whether or not the account exists.
+"""
+import os
+import secrets
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+
+_slots = None
+_dummy_hash = None
+_lock = threading.Lock()
+
+
+def hash_slots():
+    """Process-wide semaphore bounding concurrent hashing, created on first use."""
+    global _slots
+    if _slots is None:
+        with _lock:
+            if _slots is None:
+                workers = getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+                _slots = threading.BoundedSemaphore(workers)
+    return _slots
+
+
+def dummy_hash():
+    """Encoded hash of a random password with the preferred hasher."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = make_password(secrets.token_urlsafe(16))
+    return _dummy_hash
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def verify_password(password, encoded):
+    """
+    Check ``password`` against ``encoded``, or against the dummy hash when
+    there is no user.
+
+    Returns (is_correct, needs_rehash). The rehash itself is left to the
+    caller so that no hashing slot is held while it writes to the database.
+    """
+    rehash = []
+    with hash_slots():
+        is_correct = check_password(password, encoded or dummy_hash(), setter=rehash.append)
+    return is_correct, bool(rehash)
+
+
+class EmailBackend(ModelBackend):
+    """Authenticate by email (case-insensitive input, stored lowercase)."""
+
+    def authenticate(self, request, email=None, password=None, username=None, **kwargs):
+        email = normalize_email(email or username)
+        if not email or password is None:
+            return None
+
+        User = get_user_model()
+        user = User._default_manager.filter(email=email).first()
+        encoded = user.password if user is not None else None
+        is_correct, needs_rehash = verify_password(password, encoded)
+
+        if user is None or not is_correct or not self.user_can_authenticate(user):
+            return None
+        if needs_rehash:
+            with hash_slots():
+                user.set_password(password)
+            user.save(update_fields=['password'])
+        return user
+
@@ -0,0 +1,93 @@
+# members/fast_json.py
+"""
+JSON encoding and decoding with orjson, falling back to the stdlib.
+
+``dumps`` produces exactly what DRF's ``JSONRenderer`` does with our settings:
+compact, UTF-8 without ``\\u`` escapes for Turkish characters, datetimes in
+ISO 8601 with ``Z`` for UTC, and anything else (``Decimal``, lazy
+translations, querysets, ...) handled by DRF's ``JSONEncoder``. orjson is
+optional; without it every function here uses ``json`` with that encoder.
+
+``FastJSONRenderer`` and ``FastJSONParser`` plug this into
+``REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES']`` / ``DEFAULT_PARSER_CLASSES``.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is used instead
+    orjson = None
+
+_encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _stdlib_dumps(data):
+    return _encoder.encode(data).encode('utf-8')
+
+
+def dumps(data):
+    """Compact UTF-8 JSON bytes of ``data``."""
+    if orjson is None:
+        return _stdlib_dumps(data)
+    try:
+        return orjson.dumps(data, default=_encoder.default, option=_OPTIONS)
+    except orjson.JSONEncodeError:
+        # Integers beyond 64 bits and the like; json handles them
+        return _stdlib_dumps(data)
+
+
+def loads(data):
+    """Parse JSON ``data`` (bytes or str)."""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with ``dumps``.
+
+    Responses are labelled ``application/json; charset=utf-8``. Indented
+    output (``Accept: application/json; indent=4``, the browsable API) is
+    left to the stdlib renderer.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None \
+                or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = dumps(data)
+        # Keep the output a strict JavaScript subset, like JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser decoding UTF-8 request bodies with ``loads``."""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            # orjson rejects NaN/Infinity, as the strict stdlib parser does
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,320 @@
+# members/location_cache.py
+"""
+Process-wide, read-only cache of the Turkish administrative location tree.
+
+The tree (city -> district -> neighborhood names, each level in Turkish
+alphabetical order via the indexed ``sort_key`` columns) is built with three
+queries on first use and then answers the location endpoints without touching
+the database.
+
+The dataset is identified by the persisted ``LocationDataVersion`` stamp.
+Saving or deleting a City, District or Neighborhood bumps it (see
+``members/signals.py``), and ``load_locations`` bumps it once per run. Every
+process re-reads the stamp at most every ``LOCATION_VERSION_CHECK_INTERVAL``
+seconds and rebuilds its tree when the stamp moved, so in between those checks
+serving a location request needs no query at all.
+
+Derived artefacts such as the encoded ``get_all_locations`` payload are
+memoised on the tree, so they live exactly as long as the dataset version they
+were built from.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .fast_json import dumps
+from .location_models import City, District, Neighborhood, LocationDataVersion
+from .user_locations import LocationResolver
+
+
+# Sent after every location version bump (once per batch of changes), with
+# ``changes``: the LocationChanges of the writes, or None when they are not
+# known. The receiver in members/signals.py brings the users' location refs
+# and the map rollup in line with the changed rows.
+location_data_changed = Signal()
+
+
+def encode_payload(data):
+    """Compact UTF-8 JSON, matching what the API's JSON renderer produces."""
+    return dumps(data)
+
+
+class LocationTree:
+    """Immutable snapshot of the location hierarchy."""
+
+    def __init__(self, city_rows, district_rows, neighborhood_rows, version=0, last_modified=None):
+        # city_rows:         ((city_id, name), ...)
+        # district_rows:     {city_id: ((district_id, name), ...)}
+        # neighborhood_rows: {district_id: ((neighborhood_id, name), ...)}
+        # Every level is already in Turkish alphabetical order.
+        self.version = version
+        self.last_modified = last_modified
+        self._all_locations_json = None
+        self._resolver = None
+
+        self.city_rows = city_rows
+        self._district_rows = district_rows
+        self._neighborhood_rows = neighborhood_rows
+
+        # Name-based lookups used by the v1 endpoints and the admin
+        self.city_names = tuple(name for _, name in city_rows)
+        self._city_ids = {name: city_id for city_id, name in city_rows}
+        self._district_ids = {
+            city_id: {name: district_id for district_id, name in rows}
+            for city_id, rows in district_rows.items()
+        }
+        self._district_names = {
+            city_id: tuple(name for _, name in rows)
+            for city_id, rows in district_rows.items()
+        }
+        self._neighborhood_names = {
+            district_id: tuple(name for _, name in rows)
+            for district_id, rows in neighborhood_rows.items()
+        }
+        self._city_names_by_id = dict(city_rows)
+        self._district_names_by_id = {
+            district_id: name
+            for rows in district_rows.values()
+            for district_id, name in rows
+        }
+
+    def has_city(self, city_name):
+        return city_name in self._city_ids
+
+    def districts(self, city_name):
+        """Sorted district names of a city, or None if the city is unknown."""
+        city_id = self._city_ids.get(city_name)
+        if city_id is None:
+            return None
+        return self._district_names.get(city_id, ())
+
+    def neighborhoods(self, city_name, district_name):
+        """Sorted neighborhood names of a district, or None if it is unknown."""
+        city_id = self._city_ids.get(city_name)
+        if city_id is None:
+            return None
+        district_id = self._district_ids.get(city_id, {}).get(district_name)
+        if district_id is None:
+            return None
+        return self._neighborhood_names.get(district_id, ())
+
+    def city_name(self, city_id):
+        """Name of a city by ID, or None if the ID is unknown."""
+        return self._city_names_by_id.get(city_id)
+
+    def district_name(self, district_id):
+        """Name of a district by ID, or None if the ID is unknown."""
+        return self._district_names_by_id.get(district_id)
+
+    def district_rows(self, city_id):
+        """((district_id, name), ...) of a city, or None if the ID is unknown."""
+        return self._district_rows.get(city_id)
+
+    def neighborhood_rows(self, district_id):
+        """((neighborhood_id, name), ...) of a district, or None if the ID is unknown."""
+        return self._neighborhood_rows.get(district_id)
+
+    def resolver(self):
+        """Folded-name -> ID resolver for user location fields, built once."""
+        if self._resolver is None:
+            self._resolver = LocationResolver(self.city_rows, self._district_rows, self._neighborhood_rows)
+        return self._resolver
+
+    def as_dict(self):
+        """Nested {city: {district: [neighborhood, ...]}} mapping."""
+        return {
+            city_name: {
+                district_name: list(self._neighborhood_names.get(district_id, ()))
+                for district_id, district_name in self._district_rows.get(city_id, ())
+            }
+            for city_id, city_name in self.city_rows
+        }
+
+    def all_locations_json(self):
+        """UTF-8 encoded ``get_all_locations`` response body, built once."""
+        body = self._all_locations_json
+        if body is None:
+            body = encode_payload({'success': True, 'locations': self.as_dict()})
+            self._all_locations_json = body
+        return body
+
+    def all_locations_json_ready(self):
+        """True when ``all_locations_json()`` is already built."""
+        return self._all_locations_json is not None
+
+
+def build_location_tree(version=0, last_modified=None):
+    """Load the whole hierarchy with one query per table."""
+    city_rows = tuple(City.objects.values_list('id', 'name').order_by('sort_key', 'name'))
+
+    district_rows = {city_id: [] for city_id, _ in city_rows}
+    neighborhood_rows = {}
+    districts = District.objects.values_list('id', 'city_id', 'name').order_by('city_id', 'sort_key', 'name')
+    for district_id, city_id, name in districts:
+        district_rows[city_id].append((district_id, name))
+        neighborhood_rows[district_id] = []
+
+    neighborhoods = Neighborhood.objects.values_list('id', 'district_id', 'name').order_by('district_id', 'sort_key', 'name')
+    for neighborhood_id, district_id, name in neighborhoods:
+        neighborhood_rows[district_id].append((neighborhood_id, name))
+
+    return LocationTree(
+        city_rows,
+        {city_id: tuple(rows) for city_id, rows in district_rows.items()},
+        {district_id: tuple(rows) for district_id, rows in neighborhood_rows.items()},
+        version,
+        last_modified,
+    )
+
+
+_tree = None
+_stamp = None
+_stamp_checked_at = 0.0
+_lock = threading.Lock()
+_batch = threading.local()
+
+
+def _stamp_is_fresh():
+    interval = getattr(settings, 'LOCATION_VERSION_CHECK_INTERVAL', 5)
+    return _stamp is not None and time.monotonic() - _stamp_checked_at < interval
+
+
+def _store_stamp(stamp):
+    global _stamp, _stamp_checked_at
+    stamp = tuple(stamp) if stamp else (0, None)
+    _stamp, _stamp_checked_at = stamp, time.monotonic()
+    return stamp
+
+
+def _stamp_query():
+    return LocationDataVersion.objects.filter(pk=1).values_list('version', 'updated_at')
+
+
+def get_location_version():
+    """
+    Return ``(version, updated_at)`` of the location dataset.
+
+    The stamp is read from the database at most once per
+    ``LOCATION_VERSION_CHECK_INTERVAL`` seconds; in between, the last value
+    seen by this process is returned.
+    """
+    stamp = _stamp
+    if not _stamp_is_fresh():
+        stamp = _store_stamp(_stamp_query().first())
+    return stamp
+
+
+async def aget_location_version():
+    """Async ``get_location_version``; the periodic check uses the async ORM."""
+    stamp = _stamp
+    if not _stamp_is_fresh():
+        stamp = _store_stamp(await _stamp_query().afirst())
+    return stamp
+
+
+def _tree_for(version, updated_at):
+    global _tree
+    tree = _tree
+    if tree is None or tree.version != version:
+        with _lock:
+            if _tree is None or _tree.version != version:
+                _tree = build_location_tree(version, updated_at)
+            tree = _tree
+    return tree
+
+
+def get_location_tree():
+    """Return the cached tree, (re)building it when the version stamp moved."""
+    return _tree_for(*get_location_version())
+
+
+async def aget_location_tree():
+    """
+    Async ``get_location_tree``.
+
+    The common case (tree current) never leaves the event loop; a rebuild
+    runs in a worker thread.
+    """
+    version, updated_at = await aget_location_version()
+    tree = _tree
+    if tree is None or tree.version != version:
+        tree = await sync_to_async(_tree_for)(version, updated_at)
+    return tree
+
+
+def invalidate_location_tree(**kwargs):
+    """Drop the cached tree and stamp; usable directly as a signal receiver."""
+    global _tree, _stamp
+    with _lock:
+        _tree = None
+        _stamp = None
+
+
+def bump_location_version(changes=None):
+    """
+    Mark the location dataset as changed for every process.
+
+    ``changes`` (a ``LocationChanges``) limits the member refresh to the
+    members it covers; None refreshes every member.
+    """
+    updated = LocationDataVersion.objects.filter(pk=1).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        LocationDataVersion.objects.get_or_create(pk=1)
+    invalidate_location_tree()
+    location_data_changed.send(sender=LocationDataVersion, changes=changes)
+
+
+def _record_change(changes):
+    if not getattr(_batch, 'depth', 0):
+        bump_location_version(changes)
+    elif not _batch.dirty:
+        _batch.dirty = True
+        _batch.changes = changes
+    elif _batch.changes is not None:
+        _batch.changes = None if changes is None else _batch.changes.merge(changes)
+
+
+def location_changed(changes=None):
+    """
+    Record a location data change, described by ``changes`` (None: unknown).
+
+    Takes effect when the current transaction commits, so writes that are
+    rolled back change nothing. Then it bumps the version, or marks the
+    batch when inside ``batched_location_changes``. Code that writes with
+    ``bulk_create`` or ``QuerySet.update`` (which send no signals) must call
+    it explicitly.
+    """
+    transaction.on_commit(partial(_record_change, changes))
+
+
+@contextmanager
+def batched_location_changes():
+    """
+    Collapse the per-row version bumps of a bulk operation into one.
+
+    Used by ``load_locations`` so that loading tens of thousands of rows
+    through the ORM bumps the stamp once at the end, with the changes of
+    every committed row merged, instead of once per row, and not at all when
+    nothing changed (or every change was rolled back).
+    """
+    if not getattr(_batch, 'depth', 0):
+        _batch.dirty = False
+        _batch.changes = None
+    _batch.depth = getattr(_batch, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _batch.depth -= 1
+        if not _batch.depth and _batch.dirty:
+            changes, _batch.changes, _batch.dirty = _batch.changes, None, False
+            bump_location_version(changes)
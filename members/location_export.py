@@ -0,0 +1,37 @@
+# members/location_export.py
+"""
+Streaming NDJSON export of the location hierarchy.
+
+One neighborhood per line, with its district and city. Rows are read with
+``QuerySet.iterator(chunk_size=...)`` (a server-side cursor where the
+database supports one), so memory use stays flat regardless of dataset size.
+"""
+from .fast_json import dumps
+from .location_models import Neighborhood
+
+DEFAULT_CHUNK_SIZE = 2000
+
+_FIELDS = ('id', 'name', 'district_id', 'district', 'city_id', 'city')
+
+
+def iter_location_ndjson(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield UTF-8 encoded NDJSON, one neighborhood per line.
+
+    Lines are yielded in blocks of ``chunk_size`` rows so that the WSGI
+    server writes a few large chunks instead of one tiny chunk per row.
+    """
+    rows = (
+        Neighborhood.objects
+        .values_list('id', 'name', 'district_id', 'district__name', 'district__city_id', 'district__city__name')
+        .order_by('district_id', 'sort_key', 'name')
+        .iterator(chunk_size=chunk_size)
+    )
+    block = []
+    for row in rows:
+        block.append(dumps(dict(zip(_FIELDS, row))))
+        if len(block) >= chunk_size:
+            yield b'\n'.join(block) + b'\n'
+            block = []
+    if block:
+        yield b'\n'.join(block) + b'\n'
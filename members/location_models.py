@@ -1,49 +1,84 @@
 # members/location_models.py
 from django.db import models
+from .turkish import turkish_sort_key
 
 
 class City(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    # Turkish alphabetical key of `name`, kept in sync on save
+    sort_key = models.CharField(max_length=100, db_index=True, editable=False, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         verbose_name = 'City'
         verbose_name_plural = 'Cities'
-        ordering = ['name']
+        ordering = ['sort_key', 'name']
     
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.sort_key = turkish_sort_key(self.name)
+        super().save(*args, **kwargs)
+
 
 class District(models.Model):
     city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='districts')
     name = models.CharField(max_length=100)
+    sort_key = models.CharField(max_length=100, editable=False, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         verbose_name = 'District'
         verbose_name_plural = 'Districts'
-        ordering = ['name']
+        ordering = ['sort_key', 'name']
         unique_together = ('city', 'name')
+        indexes = [
+            models.Index(fields=['city', 'sort_key', 'name'], name='members_district_sort_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.city.name})"
 
+    def save(self, *args, **kwargs):
+        self.sort_key = turkish_sort_key(self.name)
+        super().save(*args, **kwargs)
+
 
 class Neighborhood(models.Model):
     district = models.ForeignKey(District, on_delete=models.CASCADE, related_name='neighborhoods')
     name = models.CharField(max_length=200)
+    sort_key = models.CharField(max_length=200, editable=False, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         verbose_name = 'Neighborhood'
         verbose_name_plural = 'Neighborhoods'
-        ordering = ['name']
+        ordering = ['sort_key', 'name']
         unique_together = ('district', 'name')
+        indexes = [
+            models.Index(fields=['district', 'sort_key', 'name'], name='members_neighborhood_sort_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.district.name}, {self.district.city.name})"
+
+    def save(self, *args, **kwargs):
+        self.sort_key = turkish_sort_key(self.name)
+        super().save(*args, **kwargs)
     
     @property
     def city(self):
-        return self.district.city
\ No newline at end of file
+        return self.district.city
+
+class LocationDataVersion(models.Model):
+    """Single-row stamp bumped whenever the location dataset changes."""
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Location Data Version'
+        verbose_name_plural = 'Location Data Version'
+
+    def __str__(self):
+        return f"v{self.version} ({self.updated_at:%Y-%m-%d %H:%M})"
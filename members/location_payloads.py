@@ -0,0 +1,171 @@
+# members/location_payloads.py
+"""
+Precompressed (gzip / brotli) location payloads on disk.
+
+``compress_locations`` writes every variant for the current dataset version
+into ``LOCATION_PAYLOAD_DIR/v<version>/``; the views only pick an existing
+file that matches the client's ``Accept-Encoding``, so compression never
+happens on the request path. When no file exists for the current version
+the views fall back to the uncompressed in-memory payload.
+"""
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse
+
+from .location_cache import encode_payload
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always written
+    brotli = None
+
+
+ALL_LOCATIONS = 'all.json'
+
+# Preferred order when the client accepts several encodings
+ENCODINGS = (
+    ('br', '.br'),
+    ('gzip', '.gz'),
+)
+
+
+def payload_root():
+    return os.fspath(getattr(settings, 'LOCATION_PAYLOAD_DIR', settings.BASE_DIR / 'location_payloads'))
+
+
+def districts_name(city_name):
+    """File name for a city's district list; hashed so any city name is safe on disk."""
+    digest = hashlib.sha1(city_name.encode('utf-8')).hexdigest()[:16]
+    return f'districts/{digest}.json'
+
+
+def _compress(body):
+    variants = {'.gz': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(body, quality=11, mode=brotli.MODE_TEXT)
+    return variants
+
+
+def write_payloads(tree, root=None):
+    """
+    Write all compressed variants for ``tree`` and drop older versions.
+
+    Files are written into a temporary directory that is renamed into place,
+    so a request never sees a half-written version. Returns
+    ``(version_dir, files_written, bytes_in, bytes_out)``.
+    """
+    root = root or payload_root()
+    os.makedirs(root, exist_ok=True)
+    version_dir = os.path.join(root, f'v{tree.version}')
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=root)
+
+    payloads = {ALL_LOCATIONS: tree.all_locations_json()}
+    for city_name in tree.city_names:
+        payloads[districts_name(city_name)] = encode_payload({
+            'success': True,
+            'city': city_name,
+            'districts': list(tree.districts(city_name)),
+        })
+
+    files_written = bytes_in = bytes_out = 0
+    try:
+        os.makedirs(os.path.join(staging, 'districts'))
+        for name, body in payloads.items():
+            bytes_in += len(body)
+            for suffix, data in _compress(body).items():
+                with open(os.path.join(staging, name + suffix), 'wb') as f:
+                    f.write(data)
+                files_written += 1
+                bytes_out += len(data)
+
+        if os.path.exists(version_dir):
+            shutil.rmtree(version_dir)
+        os.rename(staging, version_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    for entry in os.listdir(root):
+        path = os.path.join(root, entry)
+        if path != version_dir and os.path.isdir(path) and entry.startswith(('v', '.staging-')):
+            shutil.rmtree(path, ignore_errors=True)
+
+    return version_dir, files_written, bytes_in, bytes_out
+
+
+def accepted_encodings(request):
+    """Content codings the client accepts (q > 0) from ``Accept-Encoding``."""
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def accepts_precompressed(request):
+    """True when the client accepts one of the ``ENCODINGS`` files."""
+    accepted = accepted_encodings(request)
+    return '*' in accepted or any(coding in accepted for coding, _ in ENCODINGS)
+
+
+def open_precompressed(request, version, name):
+    """
+    (coding, open binary file) for the best precompressed variant of
+    ``name`` for ``version``, or None when the client accepts no encoding we
+    have on disk.
+    """
+    accepted = accepted_encodings(request)
+    if not accepted:
+        return None
+    base = os.path.join(payload_root(), f'v{version}', name)
+    for coding, suffix in ENCODINGS:
+        if coding not in accepted and '*' not in accepted:
+            continue
+        try:
+            return coding, open(base + suffix, 'rb')
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def read_precompressed(request, version, name):
+    """
+    (coding, bytes) of the variant ``open_precompressed`` picks, or None.
+
+    Blocking file I/O: async views call it through ``sync_to_async``.
+    """
+    found = open_precompressed(request, version, name)
+    if found is None:
+        return None
+    coding, f = found
+    with f:
+        return coding, f.read()
+
+
+def precompressed_response(request, version, name):
+    """
+    Stream the best precompressed variant of ``name`` for ``version``.
+
+    Returns None when the client accepts no encoding we have on disk.
+    """
+    found = open_precompressed(request, version, name)
+    if found is None:
+        return None
+    coding, f = found
+    response = FileResponse(f, content_type='application/json; charset=utf-8')
+    del response['Content-Disposition']
+    response['Content-Encoding'] = coding
+    return response
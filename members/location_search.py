@@ -0,0 +1,115 @@
+# members/location_search.py
+"""
+In-memory prefix index for location autocomplete.
+
+Every city, district and neighborhood name is folded with ``turkish_fold``
+(so ``i/İ/ı/I`` and ç/ğ/ö/ş/ü match their plain forms) and stored in sorted
+arrays; a lookup is a ``bisect`` plus a slice. Names are indexed both from
+their start and from the start of every later word, so "moda" finds
+"Moda Mahallesi" and "caferaga" finds "Caferağa Mahallesi".
+
+The index is built from the cached location tree and rebuilt whenever that
+tree is replaced.
+"""
+import threading
+from bisect import bisect_left
+
+from .location_cache import get_location_tree
+from .turkish import turkish_fold
+
+# Result types in display priority order
+CITY, DISTRICT, NEIGHBORHOOD = 'city', 'district', 'neighborhood'
+KINDS = (CITY, DISTRICT, NEIGHBORHOOD)
+
+
+class LocationSearchIndex:
+    """Sorted (folded key, entry) arrays per match type and location kind."""
+
+    def __init__(self, tree):
+        self.tree = tree
+        # entries[i] = (kind, city, district, neighborhood)
+        self.entries = []
+        name_keys = {kind: [] for kind in KINDS}
+        word_keys = {kind: [] for kind in KINDS}
+
+        def add(kind, name, entry):
+            index = len(self.entries)
+            self.entries.append(entry)
+            folded = ' '.join(turkish_fold(name).split())
+            name_keys[kind].append((folded, index))
+            position = folded.find(' ')
+            while position != -1:
+                word_keys[kind].append((folded[position + 1:], index))
+                position = folded.find(' ', position + 1)
+
+        for city in tree.city_names:
+            add(CITY, city, (CITY, city, None, None))
+            for district in tree.districts(city):
+                add(DISTRICT, district, (DISTRICT, city, district, None))
+                for neighborhood in tree.neighborhoods(city, district):
+                    add(NEIGHBORHOOD, neighborhood, (NEIGHBORHOOD, city, district, neighborhood))
+
+        # Whole-name matches rank above word matches, cities above districts
+        # above neighborhoods; within a bucket results are alphabetical.
+        self._buckets = []
+        for keys in (name_keys, word_keys):
+            for kind in KINDS:
+                pairs = sorted(keys[kind])
+                self._buckets.append(([key for key, _ in pairs], [index for _, index in pairs]))
+
+    def search(self, query, limit=10):
+        """Entries whose name, or a word in it, starts with ``query``."""
+        prefix = ' '.join(turkish_fold(query).split())
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        for keys, indexes in self._buckets:
+            position = bisect_left(keys, prefix)
+            while position < len(keys) and keys[position].startswith(prefix):
+                index = indexes[position]
+                if index not in seen:
+                    seen.add(index)
+                    results.append(self.entries[index])
+                    if len(results) >= limit:
+                        return results
+                position += 1
+        return results
+
+
+def format_result(entry):
+    kind, city, district, neighborhood = entry
+    parts = [part for part in (neighborhood, district, city) if part]
+    return {
+        'type': kind,
+        'name': parts[0],
+        'city': city,
+        'district': district,
+        'neighborhood': neighborhood,
+        'path': ' / '.join(parts),
+    }
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def search_index_ready(tree):
+    """True when the index for ``tree`` is already built."""
+    index = _index
+    return index is not None and index.tree is tree
+
+
+def get_search_index(tree=None):
+    """Return the search index for ``tree`` (default: the current location tree)."""
+    global _index
+    if tree is None:
+        tree = get_location_tree()
+    index = _index
+    if index is None or index.tree is not tree:
+        with _lock:
+            if _index is None or _index.tree is not tree:
+                _index = LocationSearchIndex(tree)
+            index = _index
+    return index
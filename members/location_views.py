@@ -1,29 +1,124 @@
 # members/location_views.py
+from calendar import timegm
+from functools import partial, wraps
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from .location_models import City, District, Neighborhood
+from .location_cache import get_location_tree, get_location_version
+from .location_payloads import ALL_LOCATIONS, accepts_precompressed, districts_name, precompressed_response
+from .location_search import format_result, get_search_index
+from .location_export import iter_location_ndjson
+
+# Result limits for /api/locations/search/
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+# Request headers the precompressed location payloads depend on
+PRECOMPRESSED_VARY = ('Accept-Encoding',)
+
+
+def version_etag(version, weak=False):
+    etag = f'"locations-v{version}"'
+    return 'W/' + etag if weak else etag
+
+
+def location_etag(request, version, vary=()):
+    """
+    ETag of ``version`` as served to ``request``.
 
+    A view varying on Accept-Encoding may answer with a precompressed file.
+    Like GZipMiddleware, the validator is weakened for every client that
+    accepts one of those encodings, since the encoded body is not
+    byte-identical. The 304 and the 200 therefore carry the same ETag
+    (If-None-Match uses weak comparison either way).
+    """
+    return version_etag(version, weak='Accept-Encoding' in vary and accepts_precompressed(request))
+
+
+def location_validators(request, vary=()):
+    """(ETag, Last-Modified timestamp) of the current location dataset version"""
+    version, updated_at = get_location_version()
+    last_modified = timegm(updated_at.utctimetuple()) if updated_at else None
+    return location_etag(request, version, vary), last_modified
+
+
+def patch_location_cache_headers(response, etag, last_modified, vary=()):
+    """
+    Add ETag / Last-Modified / Cache-Control to a 200 or 304 location response.
+
+    Errors (unknown names, 500s) get none of them, so shared caches do not keep
+    them for an hour and a client never revalidates one into a 304.
+    """
+    if vary:
+        patch_vary_headers(response, vary)
+    if response.status_code not in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        return response
+    if not response.has_header('ETag'):
+        response['ETag'] = etag
+    if last_modified and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'LOCATION_CACHE_MAX_AGE', 3600))
+    return response
 
+
+def location_cache_headers(view=None, vary=()):
+    """
+    Add ETag / Last-Modified / Cache-Control to a location view.
+
+    Conditional requests are answered with 304 from the cached version stamp
+    before the view runs, so a revalidation costs no query. ``vary`` lists
+    request headers the response depends on; they are sent on the 304s too.
+    """
+    if view is None:
+        return partial(location_cache_headers, vary=vary)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        etag, last_modified = location_validators(request, vary)
+        response = None
+        if request.method in ('GET', 'HEAD'):
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view(request, *args, **kwargs)
+        return patch_location_cache_headers(response, etag, last_modified, vary)
+    return wrapper
+
+
+def precompressed_or(request, tree, name, build_response):
+    """
+    Serve the precompressed file for ``name`` when the client accepts one,
+    otherwise the uncompressed response from ``build_response()``.
+
+    Views using this must be decorated with
+    ``location_cache_headers(vary=PRECOMPRESSED_VARY)``.
+    """
+    response = precompressed_response(request, tree.version, name)
+    if response is None:
+        response = build_response()
+    patch_vary_headers(response, PRECOMPRESSED_VARY)
+    return response
+
+
+
+
+@location_cache_headers
 @api_view(['GET'])
 def get_cities(request):
     """Get all cities"""
     try:
-        cities = City.objects.all().values_list('name', flat=True).order_by('name')
-        city_list = list(cities)
-        
-        # Ensure proper UTF-8 encoding
-        city_list = [str(c) for c in city_list]
+        city_list = list(get_location_tree().city_names)
         
-        response = Response({
+        return Response({
             'success': True,
             'cities': city_list
         }, status=status.HTTP_200_OK)
         
-        # Explicitly set content type for UTF-8
-        response['Content-Type'] = 'application/json; charset=utf-8'
-        return response
-        
     except Exception as e:
         return Response({
             'success': False,
@@ -31,26 +126,21 @@ def get_cities(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@location_cache_headers(vary=PRECOMPRESSED_VARY)
 @api_view(['GET'])
 def get_districts(request, city_name):
     """Get districts for a specific city"""
     try:
-        city = City.objects.get(name=city_name)
-        districts = city.districts.all().values_list('name', flat=True).order_by('name')
-        district_list = list(districts)
-        
-        # Ensure proper UTF-8 encoding
-        district_list = [str(d) for d in district_list]
-        
-        response = Response({
+        tree = get_location_tree()
+        districts = tree.districts(city_name)
+        if districts is None:
+            raise City.DoesNotExist
+
+        return precompressed_or(request, tree, districts_name(city_name), lambda: Response({
             'success': True,
             'city': city_name,
-            'districts': district_list
-        }, status=status.HTTP_200_OK)
-        
-        # Explicitly set content type for UTF-8
-        response['Content-Type'] = 'application/json; charset=utf-8'
-        return response
+            'districts': list(districts)
+        }, status=status.HTTP_200_OK))
         
     except City.DoesNotExist:
         return Response({
@@ -64,29 +154,26 @@ def get_districts(request, city_name):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@location_cache_headers
 @api_view(['GET'])
 def get_neighborhoods(request, city_name, district_name):
     """Get neighborhoods for a specific district in a city"""
     try:
-        city = City.objects.get(name=city_name)
-        district = city.districts.get(name=district_name)
-        neighborhoods = district.neighborhoods.all().values_list('name', flat=True).order_by('name')
+        tree = get_location_tree()
+        if not tree.has_city(city_name):
+            raise City.DoesNotExist
+        neighborhoods = tree.neighborhoods(city_name, district_name)
+        if neighborhoods is None:
+            raise District.DoesNotExist
         neighborhood_list = list(neighborhoods)
         
-        # Ensure proper UTF-8 encoding
-        neighborhood_list = [str(n) for n in neighborhood_list]
-        
-        response = Response({
+        return Response({
             'success': True,
             'city': city_name,
             'district': district_name,
             'neighborhoods': neighborhood_list
         }, status=status.HTTP_200_OK)
         
-        # Explicitly set content type for UTF-8
-        response['Content-Type'] = 'application/json; charset=utf-8'
-        return response
-        
     except City.DoesNotExist:
         return Response({
             'success': False,
@@ -104,29 +191,128 @@ def get_neighborhoods(request, city_name, district_name):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@location_cache_headers(vary=PRECOMPRESSED_VARY)
 @api_view(['GET'])
 def get_all_locations(request):
     """Get all location data in hierarchical structure"""
     try:
-        locations = {}
-        
-        for city in City.objects.prefetch_related('districts__neighborhoods').all():
-            city_districts = {}
-            
-            for district in city.districts.all():
-                district_neighborhoods = list(
-                    district.neighborhoods.all().values_list('name', flat=True).order_by('name')
-                )
-                city_districts[district.name] = district_neighborhoods
-            
-            locations[city.name] = city_districts
-        
+        tree = get_location_tree()
+        return precompressed_or(
+            request, tree, ALL_LOCATIONS,
+            lambda: HttpResponse(tree.all_locations_json(), content_type='application/json; charset=utf-8'),
+        )
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': 'Konum verileri alınırken hata oluştu'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@location_cache_headers
+@api_view(['GET'])
+def export_locations(request):
+    """Stream every neighborhood with its district and city as NDJSON"""
+    response = StreamingHttpResponse(
+        iter_location_ndjson(),
+        content_type='application/x-ndjson; charset=utf-8'
+    )
+    response['Content-Disposition'] = 'attachment; filename="locations.ndjson"'
+    return response
+
+
+@location_cache_headers
+@api_view(['GET'])
+def search_locations(request):
+    """Autocomplete over cities, districts and neighborhoods (?q=...&limit=...)"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return Response({
+            'success': False,
+            'error': 'Arama metni (q) gereklidir'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = int(request.GET.get('limit', SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        limit = SEARCH_DEFAULT_LIMIT
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+    try:
+        results = get_search_index().search(query, limit)
         return Response({
             'success': True,
-            'locations': locations
+            'query': query,
+            'results': [format_result(entry) for entry in results]
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
             'success': False,
-            'error': 'Konum verileri alınırken hata oluştu'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            'error': 'Konum araması sırasında hata oluştu'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# ID-based v2 endpoints: compact [id, name] pairs resolved from the cached
+# tree by primary key, so clients can store IDs instead of Turkish names.
+
+@location_cache_headers
+@api_view(['GET'])
+def get_cities_v2(request):
+    """All cities as [id, name] pairs"""
+    try:
+        return Response({
+            'success': True,
+            'cities': get_location_tree().city_rows
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': 'Şehir verileri alınırken hata oluştu'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@location_cache_headers
+@api_view(['GET'])
+def get_districts_v2(request, city_id):
+    """Districts of a city as [id, name] pairs"""
+    try:
+        districts = get_location_tree().district_rows(city_id)
+        if districts is None:
+            return Response({
+                'success': False,
+                'error': 'Şehir bulunamadı'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'success': True,
+            'city_id': city_id,
+            'districts': districts
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': 'İlçe verileri alınırken hata oluştu'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@location_cache_headers
+@api_view(['GET'])
+def get_neighborhoods_v2(request, district_id):
+    """Neighborhoods of a district as [id, name] pairs"""
+    try:
+        neighborhoods = get_location_tree().neighborhood_rows(district_id)
+        if neighborhoods is None:
+            return Response({
+                'success': False,
+                'error': 'İlçe bulunamadı'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'success': True,
+            'district_id': district_id,
+            'neighborhoods': neighborhoods
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': 'Mahalle verileri alınırken hata oluştu'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from members.location_models import City, District, Neighborhood
+from members.member_rollup import rebuild_rollup
+from members.models import MemberLocationRollup, User
+from members.user_locations import BACKFILL_CHUNK_SIZE, LocationResolver, backfill_user_locations
+
+
+class Command(BaseCommand):
+    help = 'Map User.city/ilce/mahalle text to City/District/Neighborhood foreign keys'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=BACKFILL_CHUNK_SIZE,
+            help=f'Users per transaction (default: {BACKFILL_CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        resolver = LocationResolver.from_models(City, District, Neighborhood)
+        scanned, updated = backfill_user_locations(
+            User, resolver, options['chunk_size'],
+            stdout=self.stdout if options['verbosity'] >= 2 else None,
+        )
+        if updated:
+            # bulk_update sends no signals; recount the map rollup
+            rebuild_rollup(User, MemberLocationRollup)
+        self.stdout.write(
+            self.style.SUCCESS(f'Scanned {scanned} users, updated {updated}.')
+        )
@@ -0,0 +1,105 @@
+import re
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework.test import force_authenticate
+from members import views
+from members.models import User
+
+# A plan step reading members_user row by row without any index
+FULL_SCAN = re.compile(r'\bSCAN (members_user)\b(?! USING)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the user list, map drill-down and admin filter queries against the '
+        'current SQLite database and fail if any of them full-scans members_user'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN checks only support SQLite.')
+
+        # Unsaved admin: passes the permission checks without touching the database
+        self.admin_user = User(pk=0, email='plan-check@localhost', role='superadmin',
+                               is_staff=True, is_superuser=True, is_active=True)
+        self.factory = RequestFactory()
+
+        sample = (
+            User.objects.filter(is_active=True, ilce_ref__isnull=False)
+            .values('city', 'ilce', 'role').first()
+            or {'city': 'Ankara', 'ilce': 'Çankaya', 'role': 'member'}
+        )
+
+        failures = []
+        for label, run in self.cases(sample):
+            for sql, params in self.capture(run):
+                plan = self.explain(sql, params)
+                scans = [step for step in plan if FULL_SCAN.search(step)]
+                if scans:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f'FULL SCAN  {label}'))
+                    self.stdout.write(f'  {sql}')
+                    for step in plan:
+                        self.stdout.write(f'    {step}')
+                elif options['verbosity'] >= 2:
+                    self.stdout.write(f'ok         {label}: {" | ".join(plan)}')
+
+        if failures:
+            raise CommandError(f'{len(failures)} queries full-scan members_user.')
+        self.stdout.write(self.style.SUCCESS('No user query falls back to a full table scan.'))
+
+    def cases(self, sample):
+        """(label, callable) pairs; each callable issues one endpoint's queries."""
+        first_page = self.api(views.get_users_by_role, '/api/users/', {'page_size': 2})
+        cursor = first_page.data.get('next_cursor')
+        return [
+            ('get_users_by_role', lambda: self.api(views.get_users_by_role, '/api/users/')),
+            ('get_users_by_role role', lambda: self.api(
+                views.get_users_by_role, '/api/users/', {'role': sample['role']})),
+            ('get_users_by_role cursor', lambda: self.api(
+                views.get_users_by_role, '/api/users/', {'cursor': cursor} if cursor else {})),
+            ('get_users_by_city counts', lambda: self.api(
+                views.get_users_by_city, '/api/users/by-city/', {'mode': 'counts'})),
+            ('get_city_members city', lambda: self.api(
+                views.get_city_members, '/api/users/by-city/members/', {'city': sample['city']})),
+            ('get_city_members district', lambda: self.api(
+                views.get_city_members, '/api/users/by-city/members/',
+                {'city': sample['city'], 'district': sample['ilce'], 'page': 2})),
+            ('get_city_members unknown city', lambda: self.api(
+                views.get_city_members, '/api/users/by-city/members/', {'city': '?'})),
+            ('admin filter role', lambda: self.changelist({'role__exact': sample['role']})),
+            ('admin filter city', lambda: self.changelist({'city': sample['city']})),
+            ('admin filter ilce', lambda: self.changelist({'ilce': sample['ilce']})),
+        ]
+
+    def api(self, view, path, params=None):
+        request = self.factory.get(path, params or {})
+        force_authenticate(request, user=self.admin_user)
+        return view(request)
+
+    def changelist(self, params):
+        request = self.factory.get('/admin/members/user/', params)
+        request.user = self.admin_user
+        response = admin.site._registry[User].changelist_view(request)
+        response.render()
+        return response
+
+    def capture(self, run):
+        """SELECTs on members_user issued while running ``run``."""
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT') and '"members_user"' in sql:
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            run()
+        return queries
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
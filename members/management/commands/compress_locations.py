@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from members.location_cache import get_location_tree
+from members.location_payloads import brotli, payload_root, write_payloads
+
+
+class Command(BaseCommand):
+    help = 'Write precompressed (gzip/brotli) location payloads for the current dataset version'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            type=str,
+            default=None,
+            help='Target directory (default: settings.LOCATION_PAYLOAD_DIR)'
+        )
+
+    def handle(self, *args, **options):
+        root = options['output_dir'] or payload_root()
+        if brotli is None:
+            self.stdout.write(
+                self.style.WARNING('brotli is not installed; writing gzip variants only.')
+            )
+
+        started = time.perf_counter()
+        tree = get_location_tree()
+        version_dir, files_written, bytes_in, bytes_out = write_payloads(tree, root)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Wrote {files_written} files for location data v{tree.version} to {version_dir}\n'
+                f'Uncompressed: {bytes_in} bytes, compressed: {bytes_out} bytes, '
+                f'took {elapsed:.2f}s'
+            )
+        )
@@ -0,0 +1,55 @@
+import time
+from django.core.management.base import BaseCommand
+from members.location_export import DEFAULT_CHUNK_SIZE, iter_location_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Export all neighborhoods with their district and city as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='-',
+            help='Output file (default: stdout)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows fetched per database round trip (default: {DEFAULT_CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        output = options['output']
+        lines = 0
+
+        out = open(output, 'wb') if output != '-' else None
+        try:
+            write = out.write if out is not None else self.stdout_writer()
+            for block in iter_location_ndjson(options['chunk_size']):
+                write(block)
+                lines += block.count(b'\n')
+        finally:
+            if out is not None:
+                out.close()
+
+        if output != '-':
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Exported {lines} neighborhoods to {output} in {time.perf_counter() - started:.2f}s'
+                )
+            )
+
+    def stdout_writer(self):
+        """
+        Write function for the encoded blocks on ``self.stdout``: its binary
+        buffer when it has one, otherwise the decoded text (e.g. a StringIO
+        passed to call_command).
+        """
+        buffer = getattr(self.stdout, 'buffer', None)
+        if buffer is not None:
+            self.stdout.flush()
+            return buffer.write
+        return lambda block: self.stdout.write(block.decode('utf-8'), ending='')
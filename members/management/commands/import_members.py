@@ -0,0 +1,240 @@
+# members/management/commands/import_members.py
+import csv
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from members.location_cache import get_location_tree
+from members.member_rollup import apply_delta, stored_rollup_keys
+from members.member_search import index_users, search_supported
+from members.models import MemberLocationRollup, User
+from members.serializers import DUPLICATE_ERRORS, UserRegistrationSerializer, duplicate_field_errors
+
+# Columns copied from the CSV into the registration serializer
+COLUMNS = ('first_name', 'last_name', 'email', 'phone', 'city', 'ilce', 'mahalle',
+           'finansal_kod_numarasi', 'password', 'role')
+
+
+def init_worker():
+    """Make the hashers usable in worker processes started with 'spawn'."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'saha_api.settings')
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        'Import members from a CSV file (columns: first_name, last_name, email, phone, '
+        'city, ilce, mahalle, password[, role, finansal_kod_numarasi])'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            type=str,
+            required=True,
+            help='Path of the CSV file (UTF-8, header row required)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Members hashed and inserted per batch (default: 500)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Processes hashing passwords (default: number of CPUs)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate every row and report errors without hashing or inserting'
+        )
+
+    def handle(self, *args, **options):
+        csv_path = options['file']
+        if not os.path.exists(csv_path):
+            raise CommandError(f'CSV file not found: {csv_path}')
+
+        self.tree = get_location_tree()
+        self.seen_emails = set()
+        self.seen_phones = set()
+        self.failed = 0
+        imported = rows_read = 0
+        hash_time = 0.0
+        started = time.perf_counter()
+
+        with open(csv_path, 'r', encoding='utf-8-sig', newline='') as file, ExitStack() as stack:
+            reader = csv.DictReader(file)
+            missing = {'email', 'password', 'city', 'ilce', 'mahalle'} - set(reader.fieldnames or ())
+            if missing:
+                raise CommandError(f'CSV is missing columns: {", ".join(sorted(missing))}')
+
+            # Started with the first batch that has passwords to hash
+            pool = None
+            rows = enumerate(reader, start=2)  # Row 1 is the header
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                rows_read += len(batch)
+
+                valid = self.validate_batch(batch)
+                if options['dry_run'] or not valid:
+                    continue
+
+                if pool is None:
+                    pool = stack.enter_context(
+                        ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker)
+                    )
+                hash_started = time.perf_counter()
+                passwords = [data['password'] for _, data in valid]
+                chunksize = max(1, len(passwords) // (options['workers'] * 4))
+                hashes = list(pool.map(make_password, passwords, chunksize=chunksize))
+                hash_time += time.perf_counter() - hash_started
+
+                imported += self.insert_batch(valid, hashes)
+                self.stdout.write(f'Processed {rows_read} rows, imported {imported}...')
+
+        elapsed = time.perf_counter() - started
+        rate = rows_read / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nImport {"checked" if options["dry_run"] else "completed"}!\n'
+                f'Rows read: {rows_read}\n'
+                f'Imported: {imported}\n'
+                f'Failed: {self.failed}\n'
+                f'Took {elapsed:.2f}s ({rate:.0f} rows/sec, '
+                f'{hash_time:.2f}s hashing on {options["workers"]} processes)'
+            )
+        )
+
+    def row_error(self, row_num, errors):
+        self.failed += 1
+        for field, messages in errors.items():
+            if isinstance(messages, (list, tuple)):
+                messages = '; '.join(str(message) for message in messages)
+            self.stdout.write(self.style.ERROR(f'Row {row_num}: {field}: {messages}'))
+
+    def validate_batch(self, batch):
+        """
+        Validate rows with the registration rules and the location tree.
+
+        Returns [(row_num, validated_data)]. Duplicates of existing members are
+        found with one email and one phone query per batch.
+        """
+        candidates = []
+        for row_num, row in batch:
+            data = {column: (row.get(column) or '').strip() for column in COLUMNS}
+            data['role'] = data['role'] or 'member'
+            data['finansal_kod_numarasi'] = data['finansal_kod_numarasi'] or '1'
+            data['confirm_password'] = data['password']
+
+            serializer = UserRegistrationSerializer(data=data)
+            if not serializer.is_valid():
+                self.row_error(row_num, serializer.errors)
+                continue
+            validated = serializer.validated_data
+            validated.pop('confirm_password')
+            validated['phone'] = validated.get('phone') or None
+
+            errors = self.location_errors(validated)
+            if validated['email'] in self.seen_emails:
+                errors['email'] = 'Bu e-posta adresi dosyada daha önce geçiyor'
+            if validated['phone'] and validated['phone'] in self.seen_phones:
+                errors['phone'] = 'Bu telefon numarası dosyada daha önce geçiyor'
+            if errors:
+                self.row_error(row_num, errors)
+                continue
+
+            self.seen_emails.add(validated['email'])
+            if validated['phone']:
+                self.seen_phones.add(validated['phone'])
+            candidates.append((row_num, validated))
+
+        emails = {data['email'] for _, data in candidates}
+        phones = {data['phone'] for _, data in candidates if data['phone']}
+        existing_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        existing_phones = set(User.objects.filter(phone__in=phones).values_list('phone', flat=True)) if phones else set()
+
+        valid = []
+        for row_num, data in candidates:
+            errors = {}
+            if data['email'] in existing_emails:
+                errors['email'] = DUPLICATE_ERRORS['email']
+            if data['phone'] in existing_phones:
+                errors['phone'] = DUPLICATE_ERRORS['phone']
+            if errors:
+                self.row_error(row_num, errors)
+            else:
+                valid.append((row_num, data))
+        return valid
+
+    def location_errors(self, data):
+        """Resolve city/ilce/mahalle against the location tree; sets the *_ref IDs."""
+        city_id, district_id, neighborhood_id = self.tree.resolver().resolve(
+            data['city'], data['ilce'], data['mahalle']
+        )
+        if city_id is None:
+            return {'city': f'Bilinmeyen şehir: {data["city"]}'}
+        if district_id is None:
+            return {'ilce': f'Bilinmeyen ilçe: {data["ilce"]}'}
+        if neighborhood_id is None:
+            return {'mahalle': f'Bilinmeyen mahalle: {data["mahalle"]}'}
+        data['city_ref_id'] = city_id
+        data['ilce_ref_id'] = district_id
+        data['mahalle_ref_id'] = neighborhood_id
+        return {}
+
+    def insert_batch(self, valid, hashes):
+        """
+        bulk_create one batch; returns the number of members inserted.
+
+        bulk_create sends no signals, so the member rollup and the search
+        index are updated here.
+        If a concurrent signup took an email or phone in the meantime, the
+        batch is retried row by row so only the conflicting rows fail.
+        """
+        users = []
+        for (row_num, data), encoded in zip(valid, hashes):
+            data.pop('password')
+            user = User(**data)
+            user.password = encoded
+            users.append((row_num, user))
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user in users])
+                self.update_derived([user for _, user in users])
+            return len(users)
+        except IntegrityError:
+            pass
+
+        inserted = 0
+        for row_num, user in users:
+            user.pk = None
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create([user])
+                    self.update_derived([user])
+                inserted += 1
+            except IntegrityError as exc:
+                self.row_error(
+                    row_num,
+                    duplicate_field_errors(exc, email=user.email, phone=user.phone) or {'general': str(exc)},
+                )
+        return inserted
+
+    def update_derived(self, users):
+        keys = Counter(filter(None, stored_rollup_keys(User, [user.pk for user in users]).values()))
+        for key, count in keys.items():
+            apply_delta(MemberLocationRollup, key, count)
+        if search_supported():
+            index_users(users)
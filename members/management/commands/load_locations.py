@@ -1,9 +1,18 @@
 # members/management/commands/load_locations.py
 import csv
 import os
-from django.core.management.base import BaseCommand
+import time
+from collections import defaultdict
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from members.location_cache import batched_location_changes, location_changed
+from members.user_locations import LocationChanges
 from members.location_models import City, District, Neighborhood
+from members.models import User
+from members.turkish import turkish_fold, turkish_sort_key
 
 
 class Command(BaseCommand):
@@ -21,113 +30,456 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing location data before loading'
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Fast path: resolve cities/districts in memory and bulk insert '
+                 'neighborhoods inside a single transaction'
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Apply only the differences between the CSV and the database '
+                 '(inserts, renames, deletes) instead of reloading everything'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='With --sync: print the changes without applying them'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Neighborhoods per INSERT in --bulk and --sync mode (default: 2000)'
+        )
+        parser.add_argument(
+            '--no-compress',
+            action='store_true',
+            help='Skip writing precompressed payloads (see compress_locations)'
+        )
 
     def handle(self, *args, **options):
         csv_file = options['file']
         csv_path = os.path.join(settings.BASE_DIR, csv_file)
-        
+
         if not os.path.exists(csv_path):
             self.stdout.write(
                 self.style.ERROR(f'CSV file not found: {csv_path}')
             )
             return
 
-        if options['clear']:
-            self.stdout.write('Clearing existing location data...')
+        if options['sync'] and (options['clear'] or options['bulk']):
+            raise CommandError('--sync cannot be combined with --clear or --bulk')
+
+        # One version bump for the whole run instead of one per row
+        with batched_location_changes():
+            if options['sync']:
+                self.load_sync(csv_path, options)
+            elif options['bulk']:
+                self.load_bulk(csv_path, options)
+            else:
+                self.load(csv_path, options)
+
+        if not options['no_compress'] and not options['dry_run']:
+            call_command('compress_locations', stdout=self.stdout)
+
+    def clear(self):
+        """
+        Delete every location row.
+
+        The deletes send a signal per row, but inside batched_location_changes
+        they only mark the dataset dirty once committed: the version is bumped
+        once, when the outermost batch (the whole run, in handle) ends. That
+        bump re-resolves the members' location refs, which the deletes null
+        through SET_NULL, against the reloaded rows and rebuilds the map
+        rollup (refresh_user_locations in members/signals.py). A cleared
+        dataset affects every member, so the refresh covers all of them.
+        """
+        self.stdout.write('Clearing existing location data...')
+        referencing = User.objects.filter(
+            Q(city_ref__isnull=False) | Q(ilce_ref__isnull=False) | Q(mahalle_ref__isnull=False)
+        ).count()
+        with batched_location_changes():
             Neighborhood.objects.all().delete()
             District.objects.all().delete()
             City.objects.all().delete()
-            self.stdout.write(self.style.SUCCESS('Existing data cleared.'))
+            location_changed()
+        self.stdout.write(self.style.SUCCESS('Existing data cleared.'))
+        if referencing:
+            self.stdout.write(
+                f'{referencing} members referenced the cleared locations; '
+                f'their location refs and the map rollup are rebuilt after loading.'
+            )
+
+    def read_rows(self, csv_path):
+        """
+        Stream cleaned (row_num, city, district, neighborhood) tuples from the CSV.
+
+        Rows with a missing value are reported and skipped.
+        """
+        with open(csv_path, 'r', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+
+            # Debug: Print column headers
+            headers = reader.fieldnames
+            self.stdout.write(f'CSV Headers: {headers}')
+
+            for row_num, row in enumerate(reader, start=2):  # Start from 2 since header is row 1
+                city_name = row.get('city', '').strip() if 'city' in row else row.get('City', '').strip()
+                district_name = row.get('district', '').strip() if 'district' in row else row.get('District', '').strip()
+                neighborhood_name = row.get('neighborhood', '').strip() if 'neighborhood' in row else row.get('Neighborhood', '').strip()
+
+                # Additional cleaning for any extra whitespace issues
+                city_name = ' '.join(city_name.split())
+                district_name = ' '.join(district_name.split())
+                neighborhood_name = ' '.join(neighborhood_name.split())
+
+                # Handle potential trailing spaces in column names
+                if not neighborhood_name:
+                    for key in row.keys():
+                        if 'neighborhood' in key.lower():
+                            neighborhood_name = row[key].strip()
+                            break
+
+                if not all([city_name, district_name, neighborhood_name]):
+                    self.stdout.write(
+                        self.style.WARNING(f'Row {row_num}: Skipping empty data - City: "{city_name}", District: "{district_name}", Neighborhood: "{neighborhood_name}"')
+                    )
+                    self.stdout.write(f'Row data: {row}')
+                    continue
+
+                yield row_num, city_name, district_name, neighborhood_name
+
+    def load(self, csv_path, options):
+        started = time.perf_counter()
+        if options['clear']:
+            self.clear()
 
         self.stdout.write(f'Loading data from {csv_path}...')
-        
+
         cities_created = 0
         districts_created = 0
         neighborhoods_created = 0
-        
+        rows_processed = 0
+
         city_cache = {}
         district_cache = {}
-        
+
         try:
-            with open(csv_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                
-                # Debug: Print column headers
-                headers = reader.fieldnames
-                self.stdout.write(f'CSV Headers: {headers}')
-                
-                for row_num, row in enumerate(reader, start=2):  # Start from 2 since header is row 1
-                    try:
-                        city_name = row.get('city', '').strip() if 'city' in row else row.get('City', '').strip()
-                        district_name = row.get('district', '').strip() if 'district' in row else row.get('District', '').strip()
-                        neighborhood_name = row.get('neighborhood', '').strip() if 'neighborhood' in row else row.get('Neighborhood', '').strip()
-                        
-                        # Additional cleaning for any extra whitespace issues
-                        city_name = ' '.join(city_name.split())
-                        district_name = ' '.join(district_name.split())
-                        neighborhood_name = ' '.join(neighborhood_name.split())
-                        
-                        # Handle potential trailing spaces in column names
-                        if not neighborhood_name:
-                            for key in row.keys():
-                                if 'neighborhood' in key.lower():
-                                    neighborhood_name = row[key].strip()
-                                    break
-                        
-                        if not all([city_name, district_name, neighborhood_name]):
-                            self.stdout.write(
-                                self.style.WARNING(f'Row {row_num}: Skipping empty data - City: "{city_name}", District: "{district_name}", Neighborhood: "{neighborhood_name}"')
-                            )
-                            self.stdout.write(f'Row data: {row}')
-                            continue
-                        
-                        # Get or create city
-                        if city_name not in city_cache:
-                            city, created = City.objects.get_or_create(name=city_name)
-                            city_cache[city_name] = city
-                            if created:
-                                cities_created += 1
-                        else:
-                            city = city_cache[city_name]
-                        
-                        # Get or create district
-                        district_key = f"{city_name}|{district_name}"
-                        if district_key not in district_cache:
-                            district, created = District.objects.get_or_create(
-                                city=city,
-                                name=district_name
-                            )
-                            district_cache[district_key] = district
-                            if created:
-                                districts_created += 1
-                        else:
-                            district = district_cache[district_key]
-                        
-                        # Create neighborhood (allow duplicates in case of CSV data inconsistencies)
-                        neighborhood, created = Neighborhood.objects.get_or_create(
-                            district=district,
-                            name=neighborhood_name
-                        )
+            for row_num, city_name, district_name, neighborhood_name in self.read_rows(csv_path):
+                try:
+                    rows_processed += 1
+
+                    # Get or create city
+                    if city_name not in city_cache:
+                        city, created = City.objects.get_or_create(name=city_name)
+                        city_cache[city_name] = city
                         if created:
-                            neighborhoods_created += 1
-                        
-                        # Progress indicator
-                        if row_num % 1000 == 0:
-                            self.stdout.write(f'Processed {row_num} rows...')
-                    
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(f'Row {row_num}: Error processing data - {str(e)}')
+                            cities_created += 1
+                    else:
+                        city = city_cache[city_name]
+
+                    # Get or create district
+                    district_key = f"{city_name}|{district_name}"
+                    if district_key not in district_cache:
+                        district, created = District.objects.get_or_create(
+                            city=city,
+                            name=district_name
                         )
-                        continue
-        
+                        district_cache[district_key] = district
+                        if created:
+                            districts_created += 1
+                    else:
+                        district = district_cache[district_key]
+
+                    # Create neighborhood (allow duplicates in case of CSV data inconsistencies)
+                    neighborhood, created = Neighborhood.objects.get_or_create(
+                        district=district,
+                        name=neighborhood_name
+                    )
+                    if created:
+                        neighborhoods_created += 1
+
+                    # Progress indicator
+                    if row_num % 1000 == 0:
+                        self.stdout.write(f'Processed {row_num} rows...')
+
+                except Exception as e:
+                    self.stdout.write(
+                        self.style.ERROR(f'Row {row_num}: Error processing data - {str(e)}')
+                    )
+                    continue
+
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Error reading CSV file: {str(e)}')
             )
             return
-        
-        # Summary
+
+        self.write_summary(cities_created, districts_created, neighborhoods_created, rows_processed, started)
+
+    def load_bulk(self, csv_path, options):
+        """
+        Load the CSV with a fixed handful of queries per batch.
+
+        Existing cities and districts are read once into dicts; new ones are
+        created as they first appear. Neighborhoods are buffered and written
+        with bulk_create(ignore_conflicts=True), so re-running against an
+        already loaded database only inserts what is missing. Everything runs
+        in one transaction: a failure leaves the previous data untouched.
+        """
+        started = time.perf_counter()
+        batch_size = options['batch_size']
+
+        self.stdout.write(f'Bulk loading data from {csv_path}...')
+
+        try:
+            with transaction.atomic():
+                if options['clear']:
+                    self.clear()
+
+                cities = {city.name: city for city in City.objects.all()}
+                districts = {
+                    (district.city_id, district.name): district.id
+                    for district in District.objects.only('id', 'city_id', 'name')
+                }
+                neighborhoods_before = Neighborhood.objects.count()
+
+                cities_created = 0
+                districts_created = 0
+                rows_processed = 0
+                batch = []
+
+                for row_num, city_name, district_name, neighborhood_name in self.read_rows(csv_path):
+                    rows_processed += 1
+
+                    city = cities.get(city_name)
+                    if city is None:
+                        city = City.objects.create(name=city_name)
+                        cities[city_name] = city
+                        cities_created += 1
+
+                    district_id = districts.get((city.id, district_name))
+                    if district_id is None:
+                        district_id = District.objects.create(city=city, name=district_name).id
+                        districts[(city.id, district_name)] = district_id
+                        districts_created += 1
+
+                    batch.append(Neighborhood(
+                        district_id=district_id,
+                        name=neighborhood_name,
+                        sort_key=turkish_sort_key(neighborhood_name),
+                    ))
+                    if len(batch) >= batch_size:
+                        Neighborhood.objects.bulk_create(batch, ignore_conflicts=True)
+                        batch = []
+                        self.stdout.write(f'Processed {rows_processed} rows...')
+
+                if batch:
+                    Neighborhood.objects.bulk_create(batch, ignore_conflicts=True)
+
+                neighborhoods_created = Neighborhood.objects.count() - neighborhoods_before
+                if neighborhoods_created:
+                    # bulk_create sends no signals
+                    location_changed(LocationChanges().add_neighborhoods(districts.values()))
+
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'Bulk load failed, no changes were saved: {str(e)}')
+            )
+            return
+
+        self.write_summary(cities_created, districts_created, neighborhoods_created, rows_processed, started)
+
+    def load_sync(self, csv_path, options):
+        """
+        Bring the database in line with the CSV by applying only the difference.
+
+        Rows that exist on both sides keep their IDs. A removed and an added
+        name under the same parent whose Turkish-folded forms are equal (e.g. a
+        casing or diacritic correction) is applied as a rename; everything else
+        is an insert or a delete. Deleting a city or district cascades to its
+        children. All changes run in one transaction.
+        """
+        started = time.perf_counter()
+        self.stdout.write(f'Syncing location data from {csv_path}...')
+
+        try:
+            csv_tree = defaultdict(lambda: defaultdict(set))
+            rows_processed = 0
+            for row_num, city_name, district_name, neighborhood_name in self.read_rows(csv_path):
+                csv_tree[city_name][district_name].add(neighborhood_name)
+                rows_processed += 1
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'Error reading CSV file: {str(e)}')
+            )
+            return
+
+        db_cities = dict(City.objects.values_list('name', 'id'))
+        db_districts = defaultdict(dict)
+        for district_id, city_id, name in District.objects.values_list('id', 'city_id', 'name'):
+            db_districts[city_id][name] = district_id
+        db_neighborhoods = defaultdict(dict)
+        for neighborhood_id, district_id, name in Neighborhood.objects.values_list('id', 'district_id', 'name').iterator(chunk_size=5000):
+            db_neighborhoods[district_id][name] = neighborhood_id
+
+        plan = {
+            'City': {'insert': [], 'rename': [], 'delete': []},
+            'District': {'insert': [], 'rename': [], 'delete': []},
+            'Neighborhood': {'insert': [], 'rename': [], 'delete': []},
+        }
+
+        city_ids = self.diff_level('City', csv_tree, db_cities, plan, lambda name: name)
+        for city_name, districts in csv_tree.items():
+            city_id = city_ids.get(city_name)
+            existing = db_districts.get(city_id, {}) if city_id else {}
+            district_ids = self.diff_level(
+                'District', districts, existing, plan,
+                lambda name, city_name=city_name: (city_id or city_name, name),
+            )
+            for district_name, neighborhoods in districts.items():
+                district_id = district_ids.get(district_name)
+                existing = db_neighborhoods.get(district_id, {}) if district_id else {}
+                self.diff_level(
+                    'Neighborhood', neighborhoods, existing, plan,
+                    lambda name, key=(city_id or city_name, district_id or district_name): (key, name),
+                )
+
+        self.write_plan(plan, options['verbosity'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: no changes applied.'))
+            return
+
+        try:
+            with transaction.atomic():
+                self.apply_plan(plan, options['batch_size'])
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'Sync failed, no changes were saved: {str(e)}')
+            )
+            return
+
+        self.write_summary(
+            len(plan['City']['insert']),
+            len(plan['District']['insert']),
+            len(plan['Neighborhood']['insert']),
+            rows_processed,
+            started,
+        )
+
+    def diff_level(self, label, wanted, existing, plan, make_key):
+        """
+        Diff one level of the hierarchy and record the operations in ``plan``.
+
+        ``wanted`` holds the CSV names, ``existing`` maps database names to
+        IDs. Returns {csv name: id} for every CSV name that already has a row
+        (directly or through a rename), so child levels can be diffed against it.
+        """
+        ids = {name: existing[name] for name in wanted if name in existing}
+        added = [name for name in wanted if name not in existing]
+        removed = [name for name in existing if name not in wanted]
+
+        # Pair up removed/added names that only differ by case or diacritics
+        added_by_fold = defaultdict(list)
+        for name in added:
+            added_by_fold[turkish_fold(name)].append(name)
+        removed_by_fold = defaultdict(list)
+        for name in removed:
+            removed_by_fold[turkish_fold(name)].append(name)
+        renamed_from = set()
+        renamed_to = set()
+        for folded, old_names in removed_by_fold.items():
+            new_names = added_by_fold.get(folded, ())
+            if len(old_names) == 1 and len(new_names) == 1:
+                old_name, new_name = old_names[0], new_names[0]
+                plan[label]['rename'].append((existing[old_name], old_name, new_name))
+                ids[new_name] = existing[old_name]
+                renamed_from.add(old_name)
+                renamed_to.add(new_name)
+
+        for name in added:
+            if name not in renamed_to:
+                plan[label]['insert'].append(make_key(name))
+        for name in removed:
+            if name not in renamed_from:
+                plan[label]['delete'].append((existing[name], name))
+        return ids
+
+    def write_plan(self, plan, verbosity):
+        self.stdout.write('\nChanges:')
+        for label, ops in plan.items():
+            self.stdout.write(
+                f'  {label}: {len(ops["insert"])} to insert, '
+                f'{len(ops["rename"])} to rename, {len(ops["delete"])} to delete'
+            )
+            for _, old_name, new_name in ops['rename']:
+                self.stdout.write(f'    rename "{old_name}" -> "{new_name}"')
+            if verbosity >= 2:
+                # City keys are names; district and neighborhood keys are
+                # (parent key, name)
+                for key in ops['insert']:
+                    name = key if isinstance(key, str) else key[-1]
+                    self.stdout.write(f'    insert "{name}"')
+                for _, name in ops['delete']:
+                    self.stdout.write(f'    delete "{name}"')
+
+    def apply_plan(self, plan, batch_size):
+        models = {'City': City, 'District': District, 'Neighborhood': Neighborhood}
+
+        # Deletes first so that renames and inserts never clash with a stale name
+        for label in ('Neighborhood', 'District', 'City'):
+            ids = [pk for pk, _ in plan[label]['delete']]
+            for start in range(0, len(ids), 500):
+                models[label].objects.filter(pk__in=ids[start:start + 500]).delete()
+
+        # QuerySet.update() and bulk_create() send no signals: record the
+        # members they may move before renaming
+        changes = LocationChanges()
+        for pk, _, _ in plan['City']['rename']:
+            changes.add_city(User, pk)
+        renamed = [pk for pk, _, _ in plan['District']['rename']]
+        for pk, city_id in District.objects.filter(pk__in=renamed).values_list('id', 'city_id'):
+            changes.add_district(User, city_id, pk)
+        renamed = [pk for pk, _, _ in plan['Neighborhood']['rename']]
+        for pk, district_id in Neighborhood.objects.filter(pk__in=renamed).values_list('id', 'district_id'):
+            changes.add_neighborhood(district_id, pk)
+
+        for label in ('City', 'District', 'Neighborhood'):
+            for pk, _, new_name in plan[label]['rename']:
+                models[label].objects.filter(pk=pk).update(
+                    name=new_name, sort_key=turkish_sort_key(new_name)
+                )
+
+        # New cities and districts are few; create them one by one so that
+        # their IDs are available to the rows below them
+        city_ids = {}
+        for city_name in plan['City']['insert']:
+            city_ids[city_name] = City.objects.create(name=city_name).id
+        district_ids = {}
+        for city_key, district_name in plan['District']['insert']:
+            city_id = city_ids.get(city_key, city_key)
+            district_ids[(city_key, district_name)] = District.objects.create(
+                city_id=city_id, name=district_name
+            ).id
+
+        batch = []
+        for (city_key, district_key), name in plan['Neighborhood']['insert']:
+            district_id = district_ids.get((city_key, district_key), district_key)
+            batch.append(Neighborhood(
+                district_id=district_id, name=name, sort_key=turkish_sort_key(name)
+            ))
+        Neighborhood.objects.bulk_create(batch, batch_size=batch_size)
+        changes.add_neighborhoods(neighborhood.district_id for neighborhood in batch)
+
+        if changes:
+            location_changed(changes)
+
+    def write_summary(self, cities_created, districts_created, neighborhoods_created, rows_processed, started):
+        elapsed = time.perf_counter() - started
+        rate = rows_processed / elapsed if elapsed else 0
         self.stdout.write(
             self.style.SUCCESS(
                 f'\nData loading completed!\n'
@@ -136,6 +488,7 @@ class Command(BaseCommand):
                 f'Neighborhoods created: {neighborhoods_created}\n'
                 f'Total cities: {City.objects.count()}\n'
                 f'Total districts: {District.objects.count()}\n'
-                f'Total neighborhoods: {Neighborhood.objects.count()}'
+                f'Total neighborhoods: {Neighborhood.objects.count()}\n'
+                f'Rows processed: {rows_processed} in {elapsed:.2f}s ({rate:.0f} rows/sec)'
             )
-        )
\ No newline at end of file
+        )
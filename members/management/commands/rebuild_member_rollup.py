@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from members.member_rollup import compute_rollup, rebuild_rollup, stored_rollup
+from members.models import MemberLocationRollup, User
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-city member count rollup from the user table and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare the stored rollup with a fresh count; fail if they differ'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            rows = rebuild_rollup(User, MemberLocationRollup)
+            self.stdout.write(f'Rebuilt member rollup: {rows} rows.')
+
+        expected = compute_rollup(User)
+        stored = stored_rollup(MemberLocationRollup)
+        mismatched = sorted(
+            key for key in expected.keys() | stored.keys()
+            if expected.get(key, 0) != stored.get(key, 0)
+        )
+        for city, district, role in mismatched[:20]:
+            key = (city, district, role)
+            self.stdout.write(
+                f'  {city} / {district or "-"} / {role}: '
+                f'stored {stored.get(key, 0)}, actual {expected.get(key, 0)}'
+            )
+        if mismatched:
+            raise CommandError(
+                f'Member rollup is out of date: {len(mismatched)} keys differ. '
+                f'Run without --check to rebuild it.'
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Member rollup is consistent: {len(expected)} keys, '
+                f'{sum(expected.values())} active members.'
+            )
+        )
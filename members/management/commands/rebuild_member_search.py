@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from members.member_search import indexed_count, rebuild_search_index, search_supported
+from members.models import User
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text member search index (SQLite FTS5) from the user table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare the number of indexed members with the user table; fail if they differ'
+        )
+
+    def handle(self, *args, **options):
+        if not search_supported():
+            raise CommandError('Member search requires SQLite with FTS5.')
+
+        if not options['check']:
+            rows = rebuild_search_index(User)
+            self.stdout.write(f'Rebuilt member search index: {rows} members.')
+
+        indexed = indexed_count()
+        users = User.objects.count()
+        if indexed != users:
+            raise CommandError(
+                f'Member search index is out of date: {indexed} indexed, {users} users. '
+                f'Run without --check to rebuild it.'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Member search index is consistent: {indexed} members.'))
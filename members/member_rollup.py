@@ -0,0 +1,171 @@
+# members/member_rollup.py
+"""
+Active member counts per (city, district, role) for the map view.
+
+``MemberLocationRollup`` holds one row per key. The ``User`` signals in
+``members/signals.py`` move a member between keys as they are saved or
+deleted, so ``get_users_by_city?mode=counts`` reads a few hundred rows
+however many members there are.
+
+Keys use the canonical location names for users whose text matched a
+location row and the stripped text otherwise. They are always read from the
+database, never from a process's (possibly stale) location tree, so the
+signals and ``compute_rollup`` agree. Location changes rename and delete rows
+without sending ``User`` signals; after every location change commits, the
+members it affects are re-resolved and moved between keys
+(``members/signals.py``).
+
+Other writes that send no signals (``QuerySet.update``, ``bulk_create``,
+``bulk_update``) leave the table stale; run ``manage.py rebuild_member_rollup``
+after them.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, When
+
+from .turkish import turkish_lower
+
+# Fields that decide which rollup key a user is counted under
+ROLLUP_FIELDS = frozenset(('city', 'ilce', 'city_ref', 'ilce_ref', 'role', 'is_active'))
+
+
+def is_istanbul(city):
+    """Turkish-aware check used to split İstanbul into districts on the map"""
+    return turkish_lower(city) == 'istanbul'
+
+
+def map_key(city, district):
+    """Map marker a (city, district) pair is counted under."""
+    return district if district and is_istanbul(city) else city
+
+
+def _key(city_name, district_name, city, ilce, role, is_active):
+    if not is_active:
+        return None
+    city = city_name or (city or '').strip()
+    if not city:
+        return None
+    return city, district_name or (ilce or '').strip(), role
+
+
+def _location_names():
+    """values() expressions of the canonical city / district names of a user."""
+    return {
+        'city_name': Case(When(city_ref__isnull=False, then='city_ref__name')),
+        'district_name': Case(When(ilce_ref__isnull=False, then='ilce_ref__name')),
+    }
+
+
+def stored_rollup_keys(User, pks, chunk_size=500):
+    """{pk: (city, district, role) or None} of the stored rows of users ``pks``."""
+    pks = list(pks)
+    keys = {}
+    for start in range(0, len(pks), chunk_size):
+        rows = User.objects.filter(pk__in=pks[start:start + chunk_size]).values(
+            'pk', 'city', 'ilce', 'role', 'is_active', **_location_names()
+        )
+        for row in rows:
+            keys[row['pk']] = _key(
+                row['city_name'], row['district_name'], row['city'], row['ilce'], row['role'], row['is_active']
+            )
+    return keys
+
+
+def stored_rollup_key(User, pk):
+    """(city, district, role) the stored row of user ``pk`` is counted under, or None."""
+    return stored_rollup_keys(User, [pk]).get(pk)
+
+
+def apply_delta(Rollup, key, delta):
+    """Add ``delta`` to the count of ``key``, creating the row if needed."""
+    city, district, role = key
+    rows = Rollup.objects.filter(city=city, district=district, role=role)
+    if rows.update(count=F('count') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            Rollup.objects.create(city=city, district=district, role=role, count=delta)
+    except IntegrityError:
+        # Created concurrently; fall back to the increment
+        rows.update(count=F('count') + delta)
+
+
+def move_rollup_keys(Rollup, previous_keys, keys):
+    """
+    Move users from ``previous_keys`` to ``keys`` (both {pk: key or None}).
+
+    Only users in ``keys`` count: one missing there was deleted meanwhile
+    and already left its previous key.
+    """
+    deltas = {}
+    for pk, key in keys.items():
+        previous = previous_keys.get(pk)
+        if previous != key:
+            if previous:
+                deltas[previous] = deltas.get(previous, 0) - 1
+            if key:
+                deltas[key] = deltas.get(key, 0) + 1
+    for key, delta in deltas.items():
+        if delta:
+            apply_delta(Rollup, key, delta)
+
+
+def compute_rollup(User):
+    """{(city, district, role): count} computed from the user table with one query."""
+    rows = (
+        User.objects.filter(is_active=True)
+        .values('role', 'city', 'ilce', **_location_names())
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    counts = {}
+    for row in rows:
+        key = _key(row['city_name'], row['district_name'], row['city'], row['ilce'], row['role'], True)
+        if key is not None:
+            counts[key] = counts.get(key, 0) + row['count']
+    return counts
+
+
+def stored_rollup(Rollup):
+    """{(city, district, role): count} as currently stored, without empty rows."""
+    return {
+        (city, district, role): count
+        for city, district, role, count in
+        Rollup.objects.filter(count__gt=0).values_list('city', 'district', 'role', 'count')
+    }
+
+
+def rebuild_rollup(User, Rollup):
+    """Replace the stored rollup with a fresh count. Returns the number of rows."""
+    counts = compute_rollup(User)
+    with transaction.atomic():
+        Rollup.objects.all().delete()
+        Rollup.objects.bulk_create(
+            Rollup(city=city, district=district, role=role, count=count)
+            for (city, district, role), count in counts.items()
+        )
+    return len(counts)
+
+
+def _map_rows(Rollup):
+    return Rollup.objects.filter(count__gt=0).values_list('city', 'district', 'count')
+
+
+def _add_map_count(counts, city, district, count):
+    key = map_key(city, district)
+    counts[key] = counts.get(key, 0) + count
+
+
+def map_counts(Rollup):
+    """{map key: member count} summed from the stored rollup."""
+    counts = {}
+    for city, district, count in _map_rows(Rollup):
+        _add_map_count(counts, city, district, count)
+    return counts
+
+
+async def amap_counts(Rollup):
+    """Async ``map_counts``."""
+    counts = {}
+    async for city, district, count in _map_rows(Rollup):
+        _add_map_count(counts, city, district, count)
+    return counts
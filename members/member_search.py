@@ -0,0 +1,206 @@
+# members/member_search.py
+"""
+Full-text member directory search (SQLite FTS5).
+
+``members_user_search`` is an FTS5 table with one row per user (rowid = user
+id) holding the member's name and the free-text profile fields
+(``meslegim``, ``ilgi_alanlarim``, ``yeteneklerim``, ``hobilerim``). Text is
+stored folded with ``turkish_fold`` and queries are folded the same way, so
+"MÜHENDİS", "mühendis" and "muhendis" all match, and every query word is a
+prefix ("müh" finds "mühendis"). Results are ranked with ``bm25``; a match in
+the name outweighs one in the profession, which outweighs the rest.
+
+``turkish_fold`` keeps offsets, so snippets are cut from the original text at
+the positions where the folded text matched.
+
+The table only exists on SQLite (migration 0013). The ``User`` signals in
+``members/signals.py`` keep it current; writes that send no signals
+(``QuerySet.update``, ``bulk_create``) need ``index_users`` or
+``manage.py rebuild_member_search``.
+"""
+import re
+
+from django.db import connection, transaction
+
+from .turkish import turkish_fold
+
+SEARCH_TABLE = 'members_user_search'
+
+# FTS columns in order, with their bm25 weights
+SEARCH_COLUMNS = (
+    ('name', 10.0),
+    ('meslegim', 5.0),
+    ('yeteneklerim', 3.0),
+    ('ilgi_alanlarim', 2.0),
+    ('hobilerim', 1.0),
+)
+TEXT_FIELDS = tuple(column for column, _ in SEARCH_COLUMNS[1:])
+# User fields an index row is built from
+SOURCE_FIELDS = frozenset(('first_name', 'last_name') + TEXT_FIELDS)
+
+MAX_QUERY_TERMS = 8
+SNIPPET_WIDTH = 120
+
+# Token characters of the unicode61 tokenizer: letters and digits
+_TOKEN = re.compile(r'[^\W_]+')
+
+_RANK = 'bm25({table}, {weights})'.format(
+    table=SEARCH_TABLE, weights=', '.join(str(weight) for _, weight in SEARCH_COLUMNS)
+)
+
+
+def search_supported(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def create_search_table(conn=None):
+    with (conn or connection).cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+            f'{", ".join(column for column, _ in SEARCH_COLUMNS)}, '
+            f"tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def drop_search_table(conn=None):
+    with (conn or connection).cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def query_terms(query):
+    """Folded query words, in order and without repeats."""
+    terms = []
+    for term in _TOKEN.findall(turkish_fold(query or '')):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def match_expression(terms):
+    """FTS5 query matching rows that contain every term as a word prefix."""
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def _document(get):
+    name = f"{get('first_name') or ''} {get('last_name') or ''}".strip()
+    return (turkish_fold(name),) + tuple(turkish_fold(get(field) or '') for field in TEXT_FIELDS)
+
+
+def index_users(users, conn=None, replace=True):
+    """
+    (Re)index users, given as instances or ``values()`` rows with ``id`` and
+    the ``SOURCE_FIELDS``. ``replace=False`` skips removing existing rows,
+    for users known not to be indexed yet.
+    """
+    rows = []
+    for user in users:
+        get = user.get if isinstance(user, dict) else (lambda field, user=user: getattr(user, field))
+        rows.append((get('id'),) + _document(get))
+    if not rows:
+        return
+    columns = ', '.join(column for column, _ in SEARCH_COLUMNS)
+    placeholders = ', '.join(['%s'] * (len(SEARCH_COLUMNS) + 1))
+    conn = conn or connection
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        if replace:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES ({placeholders})', rows
+        )
+
+
+def remove_user(user_id, conn=None):
+    with (conn or connection).cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [user_id])
+
+
+def rebuild_search_index(User, batch_size=2000):
+    """Replace the index with every user in ``User``. Returns the number of rows."""
+    conn = connection
+    count = 0
+    with transaction.atomic():
+        with conn.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        batch = []
+        for row in User.objects.values('id', *SOURCE_FIELDS).order_by('id').iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                index_users(batch, conn, replace=False)
+                count += len(batch)
+                batch = []
+        index_users(batch, conn, replace=False)
+        count += len(batch)
+    with conn.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def indexed_count():
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def matching_ids_sql(terms):
+    """(sql, params) selecting the ids of users matching ``terms``."""
+    return (
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        [match_expression(terms)],
+    )
+
+
+def search_member_ids(terms, filters=(), limit=20, offset=0):
+    """
+    Ids of active members matching ``terms``, best first.
+
+    ``filters`` are (sql, params) conditions on the members_user alias ``u``.
+    """
+    where = [f'{SEARCH_TABLE} MATCH %s', 'u.is_active']
+    params = [match_expression(terms)]
+    for sql, filter_params in filters:
+        where.append(sql)
+        params.extend(filter_params)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT s.rowid FROM {SEARCH_TABLE} s JOIN members_user u ON u.id = s.rowid '
+            f'WHERE {" AND ".join(where)} ORDER BY {_RANK} LIMIT %s OFFSET %s',
+            params + [limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def build_snippet(user, terms, width=SNIPPET_WIDTH):
+    """
+    Excerpt of the first profile field (in ranking order) containing a query
+    word: {'field', 'text', 'highlights': [[start, end], ...]}, or None if
+    only the name matched. Highlight offsets index into ``text``.
+    """
+    for field in TEXT_FIELDS:
+        text = user.get(field) or ''
+        folded = turkish_fold(text)
+        spans = [
+            match.span() for match in _TOKEN.finditer(folded)
+            if any(match.group().startswith(term) for term in terms)
+        ]
+        if not spans:
+            continue
+
+        start = max(0, spans[0][0] - width // 4)
+        if start:
+            # Start at a word boundary
+            space = text.find(' ', start, spans[0][0])
+            start = space + 1 if space != -1 else start
+        end = min(len(text), start + width)
+        if end < len(text):
+            space = text.rfind(' ', spans[0][1], end)
+            end = space if space != -1 else end
+
+        prefix = '…' if start else ''
+        suffix = '…' if end < len(text) else ''
+        shift = len(prefix) - start
+        return {
+            'field': field,
+            'text': prefix + text[start:end] + suffix,
+            'highlights': [[s + shift, e + shift] for s, e in spans if s >= start and e <= end],
+        }
+    return None
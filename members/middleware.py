@@ -0,0 +1,60 @@
+# members/middleware.py
+"""
+Session authentication without a user query on every request.
+
+Django's ``AuthenticationMiddleware`` loads ``request.user`` from the database
+on each request. ``CachedAuthenticationMiddleware`` keeps the users it has
+resolved in ``session_users`` (see ``members/user_cache.py``), keyed by
+session key, so a warm authenticated request only reads the session.
+
+The session itself is not cached per process: it comes from the database, or
+from ``cached_db`` backed by a cache all workers share. An entry is only
+reused while that session still names the same user with the same auth hash,
+so logging out (in any worker), logging in as someone else or changing the
+password never returns a stale user; logging out also drops the entry.
+
+Other changes to the user (role, is_active) are dropped from the cache only
+in the process that saved them. With several processes per host the others
+serve the old user for up to ``AUTH_USER_CACHE_TTL`` seconds, so run one.
+"""
+from django.contrib import auth
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from .user_cache import session_users
+
+
+def get_user(request):
+    """``django.contrib.auth.get_user`` answered from ``session_users`` when possible."""
+    session = request.session
+    user_id = session.get(SESSION_KEY)
+    if user_id is None:
+        return auth.get_user(request)
+
+    tag = (str(user_id), session.get(HASH_SESSION_KEY))
+    if session.session_key:
+        hit = session_users.get(session.session_key)
+        if hit is not None and hit[0] == tag:
+            return hit[1]
+
+    user = auth.get_user(request)
+    # get_user verified the session hash (and may have cycled the key)
+    if user.is_authenticated and session.session_key:
+        tag = (str(user.pk), session.get(HASH_SESSION_KEY))
+        session_users.set(session.session_key, user.pk, tag, user)
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """Drop-in replacement for AuthenticationMiddleware backed by ``session_users``."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: self.get_user(request))
+
+    @staticmethod
+    def get_user(request):
+        if not hasattr(request, '_cached_user'):
+            request._cached_user = get_user(request)
+        return request._cached_user
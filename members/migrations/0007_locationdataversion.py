@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0006_user_hobilerim_user_ilgi_alanlarim_user_meslegim_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationDataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Location Data Version',
+                'verbose_name_plural': 'Location Data Version',
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:18
+
+from django.db import migrations, models
+
+# Frozen copy of members.turkish.turkish_sort_key as of this migration, so
+# that later changes to the app module do not change what it writes.
+TURKISH_ALPHABET = 'abcçdefgğhıijklmnoöpqrsştuüvwxyz'
+_LOWER_TABLE = str.maketrans({'I': 'ı', 'İ': 'i'})
+_SORT_TABLE = str.maketrans({
+    **{letter: chr(0xE000 + rank) for rank, letter in enumerate(TURKISH_ALPHABET)},
+    'â': chr(0xE000 + TURKISH_ALPHABET.index('a')),
+    'î': chr(0xE000 + TURKISH_ALPHABET.index('i')),
+    'û': chr(0xE000 + TURKISH_ALPHABET.index('u')),
+})
+
+
+def turkish_sort_key(text):
+    if not text:
+        return ''
+    return text.translate(_LOWER_TABLE).lower().translate(_SORT_TABLE)
+
+
+def fill_sort_keys(apps, schema_editor):
+    """Populate sort_key for rows that existed before the column."""
+    for model_name in ('City', 'District', 'Neighborhood'):
+        model = apps.get_model('members', model_name)
+        batch = []
+        for obj in model.objects.only('id', 'name').iterator(chunk_size=2000):
+            obj.sort_key = turkish_sort_key(obj.name)
+            batch.append(obj)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['sort_key'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['sort_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0007_locationdataversion'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='city',
+            options={'ordering': ['sort_key', 'name'], 'verbose_name': 'City', 'verbose_name_plural': 'Cities'},
+        ),
+        migrations.AlterModelOptions(
+            name='district',
+            options={'ordering': ['sort_key', 'name'], 'verbose_name': 'District', 'verbose_name_plural': 'Districts'},
+        ),
+        migrations.AlterModelOptions(
+            name='neighborhood',
+            options={'ordering': ['sort_key', 'name'], 'verbose_name': 'Neighborhood', 'verbose_name_plural': 'Neighborhoods'},
+        ),
+        migrations.AddField(
+            model_name='city',
+            name='sort_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='district',
+            name='sort_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='neighborhood',
+            name='sort_key',
+            field=models.CharField(default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_sort_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='district',
+            index=models.Index(fields=['city', 'sort_key', 'name'], name='members_district_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='neighborhood',
+            index=models.Index(fields=['district', 'sort_key', 'name'], name='members_neighborhood_sort_idx'),
+        ),
+    ]
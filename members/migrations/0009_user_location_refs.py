@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0008_location_sort_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='city_ref',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='users', to='members.city'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='ilce_ref',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='users', to='members.district'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='mahalle_ref',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='users', to='members.neighborhood'),
+        ),
+    ]
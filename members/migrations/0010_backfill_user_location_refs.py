@@ -0,0 +1,87 @@
+from django.db import migrations, transaction
+
+# Frozen copies of the helpers in members.turkish / members.user_locations as
+# of this migration, so that later changes to those modules do not change
+# (or break) what it does.
+_LOWER_TABLE = str.maketrans({'I': 'ı', 'İ': 'i'})
+_FOLD_TABLE = str.maketrans({
+    'ç': 'c', 'ğ': 'g', 'ı': 'i', 'ö': 'o', 'ş': 's', 'ü': 'u',
+    'â': 'a', 'î': 'i', 'û': 'u',
+})
+CHUNK_SIZE = 1000
+
+
+def _fold(name):
+    if not name:
+        return ''
+    return ' '.join(name.translate(_LOWER_TABLE).lower().translate(_FOLD_TABLE).split())
+
+
+def _index(pairs):
+    """{key: id} over (parent, name, id), exact names first, folded names as fallback."""
+    exact = {}
+    folded = {}
+    for parent, name, pk in pairs:
+        exact[(parent, name)] = pk
+        folded.setdefault((parent, _fold(name)), pk)
+    return exact, folded
+
+
+def _lookup(index, parent, name):
+    if not name:
+        return None
+    exact, folded = index
+    pk = exact.get((parent, name.strip()))
+    if pk is None:
+        pk = folded.get((parent, _fold(name)))
+    return pk
+
+
+def forwards(apps, schema_editor):
+    """Map existing city/ilce/mahalle strings to location IDs in chunks."""
+    User = apps.get_model('members', 'User')
+    cities = _index((None, name, pk) for pk, name in apps.get_model('members', 'City').objects.values_list('id', 'name'))
+    districts = _index(apps.get_model('members', 'District').objects.values_list('city_id', 'name', 'id'))
+    neighborhoods = _index(
+        apps.get_model('members', 'Neighborhood').objects.values_list('district_id', 'name', 'id').iterator(chunk_size=5000)
+    )
+
+    fields = ('city_ref', 'ilce_ref', 'mahalle_ref')
+    last_id = 0
+    while True:
+        rows = list(
+            User.objects.filter(pk__gt=last_id)
+            .order_by('pk')
+            .values_list('pk', 'city', 'ilce', 'mahalle', *fields)[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        changed = []
+        for pk, city, ilce, mahalle, *current in rows:
+            city_id = _lookup(cities, None, city)
+            district_id = _lookup(districts, city_id, ilce) if city_id else None
+            neighborhood_id = _lookup(neighborhoods, district_id, mahalle) if district_id else None
+            if tuple(current) != (city_id, district_id, neighborhood_id):
+                changed.append(User(
+                    pk=pk, city_ref_id=city_id, ilce_ref_id=district_id, mahalle_ref_id=neighborhood_id
+                ))
+        if changed:
+            with transaction.atomic():
+                User.objects.bulk_update(changed, fields)
+
+
+class Migration(migrations.Migration):
+
+    # Each chunk commits on its own so an interrupted backfill keeps its
+    # progress; re-running only writes rows that still need it.
+    atomic = False
+
+    dependencies = [
+        ('members', '0009_user_location_refs'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
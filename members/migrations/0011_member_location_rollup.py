@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:29
+
+from django.db import migrations, models
+from django.db.models import Case, Count, When
+
+
+def forwards(apps, schema_editor):
+    """
+    Fill the rollup from the existing users.
+
+    A frozen copy of members.member_rollup.compute_rollup as of this
+    migration, so that later changes to that module do not affect it.
+    """
+    User = apps.get_model('members', 'User')
+    MemberLocationRollup = apps.get_model('members', 'MemberLocationRollup')
+    rows = (
+        User.objects.filter(is_active=True)
+        .values(
+            'role',
+            'city',
+            'ilce',
+            city_name=Case(When(city_ref__isnull=False, then='city_ref__name')),
+            district_name=Case(When(ilce_ref__isnull=False, then='ilce_ref__name')),
+        )
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    counts = {}
+    for row in rows:
+        city = row['city_name'] or (row['city'] or '').strip()
+        if city:
+            key = (city, row['district_name'] or (row['ilce'] or '').strip(), row['role'])
+            counts[key] = counts.get(key, 0) + row['count']
+    MemberLocationRollup.objects.bulk_create(
+        MemberLocationRollup(city=city, district=district, role=role, count=count)
+        for (city, district, role), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0010_backfill_user_location_refs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberLocationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(max_length=100)),
+                ('district', models.CharField(blank=True, default='', max_length=100)),
+                ('role', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Member Location Rollup',
+                'verbose_name_plural': 'Member Location Rollup',
+                'unique_together': {('city', 'district', 'role')},
+            },
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+# Frozen copies of the members.member_search / members.turkish helpers as of
+# this migration, so that later changes to those modules do not change the
+# table it creates or (on a fresh database) break it.
+SEARCH_TABLE = 'members_user_search'
+SEARCH_COLUMNS = ('name', 'meslegim', 'yeteneklerim', 'ilgi_alanlarim', 'hobilerim')
+TEXT_FIELDS = SEARCH_COLUMNS[1:]
+BATCH_SIZE = 2000
+
+_LOWER_TABLE = str.maketrans({'I': 'ı', 'İ': 'i'})
+_FOLD_TABLE = str.maketrans({
+    'ç': 'c', 'ğ': 'g', 'ı': 'i', 'ö': 'o', 'ş': 's', 'ü': 'u',
+    'â': 'a', 'î': 'i', 'û': 'u',
+})
+
+
+def _fold(text):
+    return (text or '').translate(_LOWER_TABLE).lower().translate(_FOLD_TABLE)
+
+
+def _insert(cursor, rows):
+    cursor.executemany(
+        f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(SEARCH_COLUMNS)}) '
+        f'VALUES ({", ".join(["%s"] * (len(SEARCH_COLUMNS) + 1))})',
+        rows,
+    )
+
+
+def forwards(apps, schema_editor):
+    """Create the FTS5 member search table (SQLite only) and index existing users."""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    User = apps.get_model('members', 'User')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+            f'{", ".join(SEARCH_COLUMNS)}, '
+            f"tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        users = User.objects.values_list('id', 'first_name', 'last_name', *TEXT_FIELDS).order_by('id')
+        batch = []
+        for pk, first_name, last_name, *texts in users.iterator(chunk_size=BATCH_SIZE):
+            name = f"{first_name or ''} {last_name or ''}".strip()
+            batch.append((pk, _fold(name), *(_fold(text) for text in texts)))
+            if len(batch) >= BATCH_SIZE:
+                _insert(cursor, batch)
+                batch = []
+        if batch:
+            _insert(cursor, batch)
+
+
+def backwards(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0012_user_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
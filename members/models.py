@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 from .location_models import City, District, Neighborhood
+from .location_cache import get_location_tree
 
 
 class UserManager(BaseUserManager):
@@ -40,6 +41,10 @@ class User(AbstractUser):
     city = models.CharField(max_length=100, blank=True, null=True, verbose_name="Şehir")
     ilce = models.CharField(max_length=100, blank=True, null=True, verbose_name="İlçe")  # District
     mahalle = models.CharField(max_length=100, blank=True, null=True, verbose_name="Mahalle")  # Neighborhood
+    # Canonical location rows for city/ilce/mahalle, resolved on save
+    city_ref = models.ForeignKey(City, on_delete=models.SET_NULL, blank=True, null=True, related_name='users', editable=False)
+    ilce_ref = models.ForeignKey(District, on_delete=models.SET_NULL, blank=True, null=True, related_name='users', editable=False)
+    mahalle_ref = models.ForeignKey(Neighborhood, on_delete=models.SET_NULL, blank=True, null=True, related_name='users', editable=False)
     finansal_kod_numarasi = models.CharField(max_length=10, blank=True, null=True, verbose_name="Finansal Kod Numarası", default="1")
     meslegim = models.TextField(blank=True, null=True, verbose_name="Mesleğim")
     ilgi_alanlarim = models.TextField(blank=True, null=True, verbose_name="İlgi Alanlarım")
@@ -57,6 +62,23 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.first_name} {self.last_name}".strip() or self.email
 
+    def save(self, *args, resolve_locations=True, **kwargs):
+        # resolve_locations=False: the caller already ran resolve_location_refs()
+        # (outside its transaction)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'city', 'ilce', 'mahalle'} & set(update_fields):
+            if resolve_locations:
+                self.resolve_location_refs()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'city_ref', 'ilce_ref', 'mahalle_ref'}
+        super().save(*args, **kwargs)
+
+    def resolve_location_refs(self):
+        """Point city_ref/ilce_ref/mahalle_ref at the rows matching the text fields."""
+        self.city_ref_id, self.ilce_ref_id, self.mahalle_ref_id = (
+            get_location_tree().resolver().resolve(self.city, self.ilce, self.mahalle)
+        )
+
     @property
     def is_superadmin(self):
         return self.role == 'superadmin'
@@ -75,4 +97,29 @@ class User(AbstractUser):
     class Meta:
         db_table = 'members_user'
         verbose_name = 'User'
-        verbose_name_plural = 'Users'
\ No newline at end of file
+        verbose_name_plural = 'Users'
+        indexes = [
+            # get_users_by_role: keyset pages, per-role pages and role counts
+            models.Index(fields=['created_at', 'id'], name='members_user_created_idx'),
+            models.Index(fields=['role', 'created_at', 'id'], name='members_user_role_created_idx'),
+            # get_city_members: members of a city / district
+            models.Index(fields=['city_ref', 'ilce_ref', 'is_active'], name='members_user_location_idx'),
+            # Admin list_filter on the text location fields
+            models.Index(fields=['city', 'ilce'], name='members_user_city_ilce_idx'),
+            models.Index(fields=['ilce'], name='members_user_ilce_idx'),
+        ]
+
+class MemberLocationRollup(models.Model):
+    """Active member count per (city, district, role); see members/member_rollup.py."""
+    city = models.CharField(max_length=100)
+    district = models.CharField(max_length=100, blank=True, default='')
+    role = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Member Location Rollup'
+        verbose_name_plural = 'Member Location Rollup'
+        unique_together = ('city', 'district', 'role')
+
+    def __str__(self):
+        return f"{self.city} / {self.district or '-'} / {self.role}: {self.count}"
@@ -0,0 +1,168 @@
+# members/representations.py
+"""
+Read-only user representations for the API responses.
+
+A representation is a named field profile compiled once, at import, into two
+functions: one reading a ``values()`` row (``row``/``rows``), one reading a
+model instance (``instance``). Both read every field with one
+``itemgetter``/``attrgetter`` call and build the dict with ``dict(zip())``,
+which skips DRF's per-field serializer machinery entirely.
+
+Profile entries are either a model field name, copied as is, or an
+(output name, ``Computed``) pair derived from one or more fields.
+"""
+from operator import attrgetter, itemgetter
+
+from .models import User
+
+ROLE_NAMES = dict(User.ROLE_CHOICES)
+ADMIN_ROLES = frozenset(('superadmin', 'admin'))
+
+
+class Computed:
+    """Output value ``func(*sources)`` computed from model fields."""
+    __slots__ = ('func', 'sources')
+
+    def __init__(self, func, *sources):
+        self.func = func
+        self.sources = sources
+
+
+def full_name(first_name, last_name):
+    return f"{first_name} {last_name}".strip()
+
+
+def role_display(role):
+    return ROLE_NAMES.get(role, role)
+
+
+USERNAME = Computed(full_name, 'first_name', 'last_name')
+ROLE_DISPLAY = Computed(role_display, 'role')
+IS_SUPERADMIN = Computed(lambda role: role == 'superadmin', 'role')
+IS_ADMIN = Computed(lambda role: role == 'admin', 'role')
+IS_MEMBER = Computed(lambda role: role == 'member', 'role')
+HAS_ADMIN_PRIVILEGES = Computed(lambda role: role in ADMIN_ROLES, 'role')
+
+
+def _compile(specs, sources, getter):
+    """
+    Function building the output dict of ``specs`` from its argument.
+
+    ``getter(*sources)`` (``itemgetter`` or ``attrgetter``) reads every source
+    field in one call; computed values are appended to that tuple and a
+    second ``itemgetter`` puts all values in output order for ``dict(zip())``.
+    """
+    index = {field: i for i, field in enumerate(sources)}
+    positions = []
+    computed = []
+    for _, spec in specs:
+        if isinstance(spec, Computed):
+            positions.append(len(sources) + len(computed))
+            computed.append((spec.func, _tuple_getter(itemgetter, [index[field] for field in spec.sources])))
+        else:
+            positions.append(index[spec])
+
+    names = tuple(output for output, _ in specs)
+    read = _tuple_getter(getter, sources)
+    order = _tuple_getter(itemgetter, positions)
+
+    if not computed:
+        return lambda obj: dict(zip(names, order(read(obj))))
+    # Computed values are called directly, without a wrapper per value
+    if len(computed) == 1:
+        (func, get), = computed
+        return lambda obj: dict(zip(names, order((values := read(obj)) + (func(*get(values)),))))
+    if len(computed) == 2:
+        (func1, get1), (func2, get2) = computed
+        return lambda obj: dict(zip(names, order(
+            (values := read(obj)) + (func1(*get1(values)), func2(*get2(values)))
+        )))
+    return lambda obj: dict(zip(names, order(
+        (values := read(obj)) + tuple([func(*get(values)) for func, get in computed])
+    )))
+
+
+def _tuple_getter(getter, keys):
+    """``getter(*keys)``, returning a tuple even for a single key."""
+    if len(keys) == 1:
+        get = getter(keys[0])
+        return lambda obj: (get(obj),)
+    return getter(*keys)
+
+
+class Representation:
+    """One compiled field profile."""
+
+    def __init__(self, name, profile):
+        self.name = name
+        specs = [(entry, entry) if isinstance(entry, str) else entry for entry in profile]
+        self.names = tuple(output for output, _ in specs)
+
+        sources = []
+        for _, spec in specs:
+            for field in spec.sources if isinstance(spec, Computed) else (spec,):
+                if not field.isidentifier():
+                    raise ValueError(f'Invalid field name in representation {name!r}: {field!r}')
+                if field not in sources:
+                    sources.append(field)
+        # Columns to pass to values() for ``rows``
+        self.fields = tuple(sources)
+
+        self.row = _compile(specs, self.fields, itemgetter)
+        self.instance = _compile(specs, self.fields, attrgetter)
+
+    def rows(self, rows):
+        """Representations of ``values()`` rows."""
+        row = self.row
+        return [row(obj) for obj in rows]
+
+    def __repr__(self):
+        return f'<Representation {self.name}: {", ".join(self.names)}>'
+
+
+PROFILES = {
+    # login_view
+    'login': ('id', 'email', 'first_name', 'last_name', 'role'),
+    # user_detail
+    'detail': ('first_name', 'last_name', 'city', 'ilce', 'mahalle', 'phone', 'email', 'role'),
+    # user_profile
+    'profile': (
+        'id', 'first_name', 'last_name', ('username', USERNAME),
+        'city', 'ilce', 'mahalle', 'finansal_kod_numarasi', 'phone', 'email',
+        'meslegim', 'ilgi_alanlarim', 'yeteneklerim', 'hobilerim',
+        'role', ('role_display', ROLE_DISPLAY),
+        ('is_superadmin', IS_SUPERADMIN), ('is_admin', IS_ADMIN), ('is_member', IS_MEMBER),
+        ('has_admin_privileges', HAS_ADMIN_PRIVILEGES),
+        'created_at',
+    ),
+    # update_user_profile
+    'profile_update': (
+        'id', 'first_name', 'last_name', ('username', USERNAME),
+        'city', 'ilce', 'mahalle', 'finansal_kod_numarasi', 'phone', 'email',
+        'meslegim', 'ilgi_alanlarim', 'yeteneklerim', 'hobilerim',
+        'role', ('role_display', ROLE_DISPLAY),
+    ),
+    # get_users_by_role
+    'list': (
+        'id', 'first_name', 'last_name', ('username', USERNAME),
+        'city', 'ilce', 'mahalle', 'phone', 'email',
+        'role', ('role_display', ROLE_DISPLAY), 'created_at', 'is_active',
+    ),
+    # change_user_role
+    'role_change': ('id', 'email', ('username', USERNAME), 'role', ('role_display', ROLE_DISPLAY)),
+    # search_members
+    'member_search': ('id', ('name', USERNAME), 'city', 'ilce', 'role', ('role_display', ROLE_DISPLAY)),
+    # Map members (get_users_by_city, get_city_members)
+    'map_member': (('name', USERNAME), 'role'),
+}
+
+REPRESENTATIONS = {name: Representation(name, profile) for name, profile in PROFILES.items()}
+
+LOGIN = REPRESENTATIONS['login']
+DETAIL = REPRESENTATIONS['detail']
+PROFILE = REPRESENTATIONS['profile']
+PROFILE_UPDATE = REPRESENTATIONS['profile_update']
+USER_LIST = REPRESENTATIONS['list']
+ROLE_CHANGE = REPRESENTATIONS['role_change']
+MEMBER_SEARCH = REPRESENTATIONS['member_search']
+MAP_MEMBER = REPRESENTATIONS['map_member']
@@ -1,11 +1,77 @@
 # members/serializers.py
+import re
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
 
 User = get_user_model()
 
+# Field errors for the unique columns, reported when the insert hits the constraint
+DUPLICATE_ERRORS = {
+    'email': 'Bu e-posta adresi ile kayıtlı bir kullanıcı zaten mevcut',
+    'phone': 'Bu telefon numarası ile kayıtlı bir kullanıcı zaten mevcut',
+}
+
+
+def violated_unique_fields(exc):
+    """
+    email/phone fields whose unique constraint an IntegrityError reports.
+
+    Read from the driver error in ``exc.__cause__``: the constraint name on
+    PostgreSQL, the key name on MySQL, the column list on SQLite. Empty for
+    any other integrity error.
+    """
+    cause = exc.__cause__ or exc
+    constraint = getattr(getattr(cause, 'diag', None), 'constraint_name', None)
+    if constraint:
+        names = [constraint]
+    else:
+        message = str(cause)
+        match = re.search(r'UNIQUE constraint failed: (.+)', message)
+        if match:
+            names = [name.strip() for name in match.group(1).split(',')]
+        else:
+            match = re.search(r"for key '([^']+)'", message)
+            names = [match.group(1)] if match else []
+
+    table = User._meta.db_table
+    fields = set()
+    for name in names:
+        if name.startswith(f'{table}.'):
+            name = name[len(table) + 1:]
+        for field in DUPLICATE_ERRORS:
+            column = User._meta.get_field(field).column
+            # Column name, or a constraint name generated by Django / PostgreSQL
+            if name == column or re.fullmatch(rf'{table}_{column}_(key|[0-9a-f]{{8}}_uniq)', name):
+                fields.add(field)
+    return fields
+
+
+def duplicate_field_errors(exc, **values):
+    """
+    Field errors for an IntegrityError on the email/phone unique constraints,
+    or None for any other integrity error.
+
+    The database only reports the first constraint it hit; with the submitted
+    ``email`` / ``phone`` values one query finds every one that is taken, so
+    both errors are returned when both are.
+    """
+    fields = violated_unique_fields(exc)
+    if not fields:
+        return None
+    values = {field: value for field, value in values.items() if field in DUPLICATE_ERRORS and value}
+    if values:
+        query = Q()
+        for field, value in values.items():
+            query |= Q(**{field: value})
+        for row in User.objects.filter(query).values(*values):
+            fields.update(field for field, value in values.items() if row[field] == value)
+    return {field: [error] for field, error in DUPLICATE_ERRORS.items() if field in fields}
+
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """
@@ -44,11 +110,9 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return attrs
 
     def validate_email(self, value):
-        # Convert to lowercase for consistency
-        value = value.lower().strip()
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Bu e-posta adresi ile kayıtlı bir kullanıcı zaten mevcut.")
-        return value
+        # Convert to lowercase for consistency; uniqueness is enforced by the
+        # insert in create()
+        return value.lower().strip()
 
     def validate_phone(self, value):
         if value:
@@ -60,10 +124,6 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             if not re.match(phone_pattern, clean_phone):
                 raise serializers.ValidationError(
                     "Lütfen geçerli bir Türk telefon numarası giriniz. (Örn: 05XXXXXXXXX)")
-
-            # Check if phone number already exists
-            if User.objects.filter(phone=value).exists():
-                raise serializers.ValidationError("Bu telefon numarası ile kayıtlı bir kullanıcı zaten mevcut.")
         return value
 
     def validate_role(self, value):
@@ -101,7 +161,21 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         password = validated_data.pop('password')
         user = User(**validated_data)
         user.set_password(password)
-        user.save()
+        user.resolve_location_refs()
+
+        # Hash and resolve the location first (save() is told not to resolve
+        # again) so the transaction only covers the insert and the writes of
+        # its post_save receivers (map rollup, search index). Duplicate
+        # email/phone is detected by the unique constraints, which also
+        # catches concurrent signups.
+        try:
+            with transaction.atomic():
+                user.save(resolve_locations=False)
+        except IntegrityError as exc:
+            errors = duplicate_field_errors(exc, email=user.email, phone=user.phone)
+            if errors is None:
+                raise
+            raise serializers.ValidationError(errors)
 
         return user
 
@@ -0,0 +1,179 @@
+# members/signals.py
+from functools import partial
+
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .location_cache import get_location_tree, location_changed, location_data_changed
+from .location_models import City, District, Neighborhood
+from .member_rollup import (
+    ROLLUP_FIELDS, apply_delta, move_rollup_keys, rebuild_rollup, stored_rollup_key, stored_rollup_keys,
+)
+from .member_search import SOURCE_FIELDS, index_users, remove_user, search_supported
+from .models import MemberLocationRollup, User
+from .user_cache import session_users, token_users
+from .user_locations import LocationChanges, backfill_user_locations, resolve_user_locations
+
+
+# Field pointing at the parent row of each location level
+LOCATION_PARENTS = {City: None, District: 'city_id', Neighborhood: 'district_id'}
+
+
+def location_row_changes(sender, instance):
+    """LocationChanges of writing or deleting ``instance``, read before the write."""
+    changes = LocationChanges()
+    if sender is City:
+        return changes.add_city(User, instance.pk)
+    if sender is District:
+        return changes.add_district(User, instance.city_id, instance.pk)
+    return changes.add_neighborhood(instance.district_id, instance.pk)
+
+
+@receiver(pre_save, sender=City, dispatch_uid='members.city_pre_save')
+@receiver(pre_save, sender=District, dispatch_uid='members.district_pre_save')
+@receiver(pre_save, sender=Neighborhood, dispatch_uid='members.neighborhood_pre_save')
+def remember_location_change(sender, instance, raw=False, **kwargs):
+    """Record the members a location save may move, or None when nothing they depend on changes."""
+    instance.__dict__.pop('_location_changes', None)
+    if raw:
+        return
+    if instance.pk is not None:
+        fields = ('name', LOCATION_PARENTS[sender]) if LOCATION_PARENTS[sender] else ('name',)
+        stored = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+        if stored == tuple(getattr(instance, field) for field in fields):
+            instance._location_changes = None
+            return
+    instance._location_changes = location_row_changes(sender, instance)
+
+
+@receiver(pre_delete, sender=City, dispatch_uid='members.city_pre_delete')
+@receiver(pre_delete, sender=District, dispatch_uid='members.district_pre_delete')
+@receiver(pre_delete, sender=Neighborhood, dispatch_uid='members.neighborhood_pre_delete')
+def remember_location_delete(sender, instance, **kwargs):
+    """Record the members a location delete may move, before SET_NULL unlinks them."""
+    instance._location_changes = location_row_changes(sender, instance)
+
+
+@receiver(post_save, sender=City, dispatch_uid='members.city_saved')
+@receiver(post_delete, sender=City, dispatch_uid='members.city_deleted')
+@receiver(post_save, sender=District, dispatch_uid='members.district_saved')
+@receiver(post_delete, sender=District, dispatch_uid='members.district_deleted')
+@receiver(post_save, sender=Neighborhood, dispatch_uid='members.neighborhood_saved')
+@receiver(post_delete, sender=Neighborhood, dispatch_uid='members.neighborhood_deleted')
+def location_row_changed(sender, instance, **kwargs):
+    """Bump the location dataset version after a location write that changed anything."""
+    if '_location_changes' not in instance.__dict__:
+        # Raw (fixture) saves: unknown changes
+        location_changed()
+        return
+    changes = instance.__dict__.pop('_location_changes')
+    if changes is not None:
+        location_changed(changes)
+
+
+@receiver(location_data_changed, dispatch_uid='members.location_data_changed')
+def refresh_user_locations(sender, changes=None, **kwargs):
+    """
+    Re-resolve the location refs of the members affected by a location
+    change and move them between map rollup keys, once the change commits.
+
+    Location renames and deletes send no ``User`` signals: a delete nulls the
+    refs through SET_NULL and a rename changes the names the rollup is keyed
+    by. With ``changes`` unknown (None), every member is re-resolved and the
+    rollup is rebuilt.
+    """
+    transaction.on_commit(partial(apply_location_changes, changes))
+
+
+def apply_location_changes(changes):
+    resolver = get_location_tree().resolver()
+    if changes is None:
+        backfill_user_locations(User, resolver)
+        rebuild_rollup(User, MemberLocationRollup)
+        return
+    pks = changes.user_pks(User)
+    if not pks:
+        return
+    previous_keys = stored_rollup_keys(User, pks)
+    previous_keys.update(changes.previous_keys)
+    resolve_user_locations(User, resolver, pks)
+    move_rollup_keys(MemberLocationRollup, previous_keys, stored_rollup_keys(User, pks))
+
+
+@receiver(pre_save, sender=User, dispatch_uid='members.user_rollup_pre_save')
+def remember_rollup_key(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Record the rollup key the user is counted under before this save."""
+    instance.__dict__.pop('_rollup_key', None)
+    if raw or (update_fields is not None and not ROLLUP_FIELDS & set(update_fields)):
+        return
+    instance._rollup_key = stored_rollup_key(sender, instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=User, dispatch_uid='members.user_rollup_saved')
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    """Move the user to their new rollup key when it changed."""
+    if raw or '_rollup_key' not in instance.__dict__:
+        return
+    old_key = instance.__dict__.pop('_rollup_key')
+    new_key = stored_rollup_key(sender, instance.pk)
+    if old_key != new_key:
+        if old_key:
+            apply_delta(MemberLocationRollup, old_key, -1)
+        if new_key:
+            apply_delta(MemberLocationRollup, new_key, 1)
+
+
+@receiver(pre_delete, sender=User, dispatch_uid='members.user_rollup_pre_delete')
+def remember_rollup_key_on_delete(sender, instance, **kwargs):
+    """Record the rollup key of a user about to be deleted."""
+    instance._rollup_key = stored_rollup_key(sender, instance.pk)
+
+
+@receiver(post_delete, sender=User, dispatch_uid='members.user_rollup_deleted')
+def update_rollup_on_delete(sender, instance, **kwargs):
+    """Stop counting a deleted user."""
+    key = instance.__dict__.pop('_rollup_key', None)
+    if key:
+        apply_delta(MemberLocationRollup, key, -1)
+
+
+@receiver(post_save, sender=User, dispatch_uid='members.user_cache_saved')
+@receiver(post_delete, sender=User, dispatch_uid='members.user_cache_deleted')
+def forget_cached_user(sender, instance, **kwargs):
+    """Make the next request of this user reload it from the database."""
+    session_users.forget_user(instance.pk)
+    token_users.forget_user(instance.pk)
+
+
+@receiver(user_logged_out, dispatch_uid='members.user_cache_logged_out')
+def forget_logged_out_session(sender, request, **kwargs):
+    """Drop the entry of the session being flushed by logout()."""
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        session_users.forget(session.session_key)
+
+
+@receiver(post_save, sender=Token, dispatch_uid='members.token_cache_saved')
+@receiver(post_delete, sender=Token, dispatch_uid='members.token_cache_deleted')
+def forget_cached_token(sender, instance, **kwargs):
+    """Stop accepting a deleted token from the cache."""
+    token_users.forget(instance.key)
+
+
+@receiver(post_save, sender=User, dispatch_uid='members.user_search_saved')
+def update_search_on_save(sender, instance, update_fields=None, **kwargs):
+    """Reindex the user's name and profile texts when they may have changed."""
+    if not search_supported():
+        return
+    if update_fields is None or SOURCE_FIELDS & set(update_fields):
+        index_users([instance])
+
+
+@receiver(post_delete, sender=User, dispatch_uid='members.user_search_deleted')
+def update_search_on_delete(sender, instance, **kwargs):
+    """Drop a deleted user from the search index."""
+    if search_supported():
+        remove_user(instance.pk)
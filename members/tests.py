@@ -0,0 +1,720 @@
+# members/tests.py
+import csv
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO, TextIOWrapper
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.db.models.signals import pre_save
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from .location_cache import bump_location_version, get_location_tree, invalidate_location_tree
+from .location_models import City, District, LocationDataVersion, Neighborhood
+from .member_rollup import compute_rollup, stored_rollup
+from .member_search import query_terms, search_member_ids
+from .models import MemberLocationRollup, User
+from .serializers import DUPLICATE_ERRORS, duplicate_field_errors, violated_unique_fields
+from .user_cache import session_users, token_users
+
+
+class LocationFixture:
+    """Ankara / Çankaya loaded and a fresh location tree, for TestCase and TransactionTestCase."""
+
+    def setUp(self):
+        invalidate_location_tree()
+        self.addCleanup(invalidate_location_tree)
+        self.city = City.objects.create(name='Ankara')
+        self.district = District.objects.create(city=self.city, name='Çankaya')
+        bump_location_version()
+
+    def load_locations(self, rows, **options):
+        """Run load_locations on a CSV of (city, district, neighborhood) rows; returns its output."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as file:
+            file.write('city,district,neighborhood\n')
+            file.writelines(f'{city},{district},{neighborhood}\n' for city, district, neighborhood in rows)
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+        call_command('load_locations', file=file.name, no_compress=True, stdout=out, **options)
+        return out.getvalue()
+
+
+class LocationTestCase(LocationFixture, TestCase):
+    pass
+
+
+class LocationTransactionTestCase(LocationFixture, TransactionTestCase):
+    """Location changes refresh the members on commit, which only happens here."""
+
+
+class LocationCacheHeadersTests(LocationTestCase):
+    def test_ok_response_is_cacheable(self):
+        response = self.client.get(reverse('get_districts', args=['Ankara']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_not_found_gets_no_validators(self):
+        for url in (reverse('get_districts', args=['Yok']), reverse('async_get_districts', args=['Yok'])):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 404)
+            self.assertFalse(response.has_header('ETag'))
+            self.assertFalse(response.has_header('Last-Modified'))
+            self.assertFalse(response.has_header('Cache-Control'))
+
+    def test_not_modified_varies_on_encoding(self):
+        for name in ('get_districts', 'async_get_districts'):
+            url = reverse(name, args=['Ankara'])
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertIn('max-age', response['Cache-Control'])
+
+    def test_not_modified_keeps_the_negotiated_etag(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(LOCATION_PAYLOAD_DIR=root):
+            call_command('compress_locations', stdout=StringIO())
+            for name in ('get_districts', 'async_get_districts'):
+                url = reverse(name, args=['Ankara'])
+                for encoding, weak in (('gzip', True), ('br, gzip', True), ('identity', False)):
+                    with self.subTest(name=name, encoding=encoding):
+                        response = self.client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+                        self.assertEqual(response.status_code, 200)
+                        etag = response['ETag']
+                        self.assertEqual(etag.startswith('W/'), weak)
+                        response = self.client.get(url, HTTP_ACCEPT_ENCODING=encoding, HTTP_IF_NONE_MATCH=etag)
+                        self.assertEqual(response.status_code, 304)
+                        self.assertEqual(response['ETag'], etag)
+
+
+class AsyncViewTests(LocationTestCase):
+    def test_precompressed_served_from_memory(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(LOCATION_PAYLOAD_DIR=root):
+            call_command('compress_locations', stdout=StringIO())
+            for name, args in (('async_get_all_locations', []), ('async_get_districts', ['Ankara'])):
+                response = self.client.get(reverse(name, args=args), HTTP_ACCEPT_ENCODING='gzip')
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.streaming)
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertTrue(response['ETag'].startswith('W/'))
+                plain = self.client.get(reverse(name.replace('async_', ''), args=args), HTTP_ACCEPT_ENCODING='identity')
+                self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_uncompressed_fallback(self):
+        response = self.client.get(reverse('async_get_all_locations'))
+        self.assertEqual(response.json(), self.client.get(reverse('get_all_locations')).json())
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_profile_auth_failures_match_drf(self):
+        user = User.objects.create_user('uye@example.com', password='Gizli-sifre-123')
+        token = Token.objects.create(user=user)
+        inactive = Token.objects.create(user=User.objects.create_user('pasif@example.com', is_active=False))
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Token'}, {'HTTP_AUTHORIZATION': 'Token a b'},
+                        {'HTTP_AUTHORIZATION': 'Token yok'}, {'HTTP_AUTHORIZATION': f'Token {inactive.key}'}):
+            expected = self.client.get(reverse('user_profile'), **headers)
+            response = self.client.get(reverse('async_user_profile'), **headers)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.json(), expected.json())
+            self.assertEqual(set(response.json()), {'detail'})
+
+        headers = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+        response = self.client.get(reverse('async_user_profile'), **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), self.client.get(reverse('user_profile'), **headers).json())
+
+
+class MemberRollupLocationChangeTests(LocationTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            'uye@example.com', first_name='Ayşe', last_name='Yılmaz',
+            city='Ankara', ilce='Çankaya', mahalle='Kızılay',
+        )
+
+    def assertRollupCurrent(self):
+        self.assertEqual(stored_rollup(MemberLocationRollup), compute_rollup(User))
+
+    def version(self):
+        return LocationDataVersion.objects.get().version
+
+    def test_admin_rename_moves_counts(self):
+        self.city.name = 'ANKARA'
+        self.city.save()
+        self.assertEqual(stored_rollup(MemberLocationRollup), {('ANKARA', 'Çankaya', 'member'): 1})
+
+        self.user.role = 'admin'
+        self.user.save()
+        self.assertEqual(stored_rollup(MemberLocationRollup), {('ANKARA', 'Çankaya', 'admin'): 1})
+
+    def test_unchanged_save_does_nothing(self):
+        version = self.version()
+        with mock.patch('members.signals.apply_location_changes') as apply:
+            self.city.save()
+            self.district.save()
+        self.assertEqual(self.version(), version)
+        apply.assert_not_called()
+
+    def test_refresh_only_touches_affected_members(self):
+        izmir = City.objects.create(name='İzmir')
+        District.objects.create(city=izmir, name='Konak')
+        other = User.objects.create_user('diger@example.com', city='İzmir', ilce='Konak')
+        # Out of line on purpose: only a full refresh would repair it
+        User.objects.filter(pk=other.pk).update(ilce_ref=None)
+
+        District.objects.create(city=self.city, name='Keçiören')
+        self.district.name = 'ÇANKAYA'
+        self.district.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.ilce_ref_id, self.district.pk)
+        self.assertEqual(stored_rollup(MemberLocationRollup)[('Ankara', 'ÇANKAYA', 'member')], 1)
+        self.assertIsNone(User.objects.get(pk=other.pk).ilce_ref_id)
+
+    def test_new_location_resolves_waiting_members(self):
+        waiting = User.objects.create_user('bursa@example.com', city='bursa', ilce='Nilüfer', mahalle='görükle')
+        self.assertEqual(stored_rollup(MemberLocationRollup)[('bursa', 'Nilüfer', 'member')], 1)
+        self.load_locations([('Bursa', 'Nilüfer', 'Görükle')], sync=True)
+
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.city_ref.name, 'Bursa')
+        self.assertEqual(waiting.ilce_ref.name, 'Nilüfer')
+        self.assertEqual(waiting.mahalle_ref.name, 'Görükle')
+        self.assertRollupCurrent()
+
+    def test_sync_rename_and_delete(self):
+        self.load_locations([('ANKARA', 'Keçiören', 'Etlik')], sync=True)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.city_ref_id, self.city.pk)
+        self.assertIsNone(self.user.ilce_ref_id)
+        self.assertRollupCurrent()
+
+        self.user.city = 'ANKARA'
+        self.user.ilce = 'Keçiören'
+        self.user.save()
+        self.assertEqual(stored_rollup(MemberLocationRollup), {('ANKARA', 'Keçiören', 'member'): 1})
+
+    def test_rolled_back_sync_changes_nothing(self):
+        version = self.version()
+        with mock.patch.object(Neighborhood.objects, 'bulk_create', side_effect=IntegrityError('boom')), \
+                mock.patch('members.signals.apply_location_changes') as apply:
+            out = self.load_locations([('ANKARA', 'Keçiören', 'Etlik')], sync=True)
+        self.assertIn('Sync failed', out)
+        self.assertEqual(self.version(), version)
+        apply.assert_not_called()
+        self.assertEqual(list(District.objects.values_list('name', flat=True)), ['Çankaya'])
+
+    def test_clear_reload_restores_refs(self):
+        version = self.version()
+        for options in ({'clear': True}, {'clear': True, 'bulk': True}):
+            self.load_locations([('Ankara', 'Çankaya', 'Kızılay')], **options)
+            version += 1
+            self.assertEqual(self.version(), version)
+
+            self.user.refresh_from_db()
+            self.assertEqual(self.user.city_ref.name, 'Ankara')
+            self.assertEqual(self.user.ilce_ref.name, 'Çankaya')
+            self.assertEqual(self.user.mahalle_ref.name, 'Kızılay')
+            self.assertRollupCurrent()
+
+    def test_delete_user(self):
+        self.user.delete()
+        self.assertEqual(stored_rollup(MemberLocationRollup), {})
+
+
+class LoadLocationsPlanTests(LocationTestCase):
+    def test_sync_plan_names(self):
+        out = self.load_locations(
+            [('ANKARA', 'Keçiören', 'Etlik'), ('Bursa', 'Nilüfer', 'Görükle')],
+            sync=True, dry_run=True, verbosity=2,
+        )
+        changes = out[out.index('Changes:'):].splitlines()
+        for line in (
+            '  City: 1 to insert, 1 to rename, 0 to delete',
+            '    rename "Ankara" -> "ANKARA"',
+            '    insert "Bursa"',
+            '  District: 2 to insert, 0 to rename, 1 to delete',
+            '    insert "Keçiören"',
+            '    insert "Nilüfer"',
+            '    delete "Çankaya"',
+            '  Neighborhood: 2 to insert, 0 to rename, 0 to delete',
+            '    insert "Etlik"',
+            '    insert "Görükle"',
+        ):
+            self.assertIn(line, changes)
+        # Dry run: nothing written
+        self.assertEqual(list(City.objects.values_list('name', flat=True)), ['Ankara'])
+        self.assertEqual(list(District.objects.values_list('name', flat=True)), ['Çankaya'])
+
+
+class ExportLocationsTests(LocationTestCase):
+    def test_ndjson_round_trip(self):
+        for name in ('Kızılay', 'Bahçelievler', 'Çukurambar'):
+            Neighborhood.objects.create(district=self.district, name=name)
+        expected = [
+            {'id': pk, 'name': name, 'district_id': self.district.pk, 'district': 'Çankaya',
+             'city_id': self.city.pk, 'city': 'Ankara'}
+            for pk, name in Neighborhood.objects.order_by('sort_key').values_list('id', 'name')
+        ]
+
+        text = StringIO()
+        call_command('export_locations', chunk_size=2, stdout=text)
+        binary = TextIOWrapper(BytesIO(), encoding='utf-8')
+        call_command('export_locations', chunk_size=2, stdout=binary)
+        binary.flush()
+        for output in (text.getvalue(), binary.buffer.getvalue().decode('utf-8')):
+            self.assertTrue(output.endswith('\n'))
+            self.assertEqual([json.loads(line) for line in output.splitlines()], expected)
+
+
+class MemberSearchTests(LocationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.engineer = User.objects.create_user(
+            'muhendis@example.com', first_name='Ayşe', last_name='Yılmaz', city='Ankara', ilce='Çankaya',
+            meslegim='Yazılım mühendisi', hobilerim='Hafta sonları İSTANBUL gezileri ve fotoğraf',
+        )
+        self.admin = User.objects.create_user(
+            'yonetici@example.com', first_name='Mehmet', last_name='Demir', city='ANKARA', role='admin',
+            meslegim='İnşaat mühendisi', ilgi_alanlarim='istanbul tarihi',
+        )
+        self.other = User.objects.create_user(
+            'izmir@example.com', first_name='Zeynep', last_name='Kaya', city='İzmir', meslegim='Makine mühendisi',
+        )
+        self.client.force_login(self.admin)
+
+    def search(self, **params):
+        response = self.client.get(reverse('search_members'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def ids(self, query):
+        return set(search_member_ids(query_terms(query)))
+
+    def test_turkish_case_folding(self):
+        self.assertEqual({result['id'] for result in self.search(q='İSTANBUL')}, {self.engineer.pk, self.admin.pk})
+        self.assertEqual(self.ids('İSTANBUL'), self.ids('istanbul'))
+        self.assertEqual(self.ids('MÜHENDİS'), {self.engineer.pk, self.admin.pk, self.other.pk})
+
+    def test_snippet_highlights(self):
+        results = {result['id']: result['snippet'] for result in self.search(q='istanbul fotoğ')}
+        snippet = results[self.engineer.pk]
+        self.assertEqual(snippet['field'], 'hobilerim')
+        self.assertEqual(
+            [snippet['text'][start:end] for start, end in snippet['highlights']], ['İSTANBUL', 'fotoğraf']
+        )
+
+    def test_index_follows_updates_and_deletes(self):
+        self.engineer.meslegim = 'Öğretmen'
+        self.engineer.save()
+        self.assertNotIn(self.engineer.pk, self.ids('mühendis'))
+        self.assertEqual(self.ids('ogretmen'), {self.engineer.pk})
+
+        self.engineer.first_name = 'Fatma'
+        self.engineer.save(update_fields=['first_name'])
+        self.assertEqual(self.ids('fatma'), {self.engineer.pk})
+        self.assertEqual(self.ids('ayşe'), set())
+
+        self.engineer.delete()
+        self.assertEqual(self.ids('ogretmen'), set())
+        self.assertEqual(self.ids('fatma'), set())
+
+    def test_filters_with_query(self):
+        def ids(**params):
+            return [result['id'] for result in self.search(q='mühendis', **params)]
+
+        self.assertCountEqual(ids(city='ankara'), [self.engineer.pk, self.admin.pk])
+        self.assertEqual(ids(city='ankara', role='admin'), [self.admin.pk])
+        self.assertEqual(ids(city='Ankara', district='ÇANKAYA'), [self.engineer.pk])
+        self.assertEqual(ids(city='İzmir'), [self.other.pk])
+        self.assertEqual(ids(city='İzmir', role='admin'), [])
+
+
+class UserListPaginationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin@example.com', role='admin', first_name='Yönetici')
+        for i in range(6):
+            User.objects.create_user(f'uye{i}@example.com', first_name=f'Üye{i}', role='member')
+        # Ties on created_at must still page without gaps or repeats
+        User.objects.filter(email__in=['uye1@example.com', 'uye2@example.com', 'uye3@example.com']).update(
+            created_at=User.objects.get(email='uye1@example.com').created_at
+        )
+        self.client.force_login(self.admin)
+
+    def get_page(self, **params):
+        response = self.client.get(reverse('get_users_by_role'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_round_trip(self):
+        seen = []
+        page = self.get_page(page_size=2)
+        while True:
+            seen += [user['id'] for user in page['users']]
+            if not page['has_next']:
+                break
+            page = self.get_page(page_size=2, cursor=page['next_cursor'])
+        self.assertIsNone(page['next_cursor'])
+        self.assertEqual(seen, list(User.objects.order_by('created_at', 'id').values_list('id', flat=True)))
+        self.assertEqual(page['total_count'], 7)
+
+    def test_cursor_with_role_filter(self):
+        page = self.get_page(page_size=4, role='member')
+        rest = self.get_page(page_size=4, role='member', cursor=page['next_cursor'])
+        ids = [user['id'] for user in page['users'] + rest['users']]
+        self.assertEqual(ids, list(User.objects.filter(role='member').order_by('created_at', 'id').values_list('id', flat=True)))
+        self.assertFalse(rest['has_next'])
+
+    def test_fixed_query_count_at_any_depth(self):
+        for i in range(6, 16):
+            User.objects.create_user(f'uye{i}@example.com', first_name=f'Üye{i}', role='member')
+        self.get_page(page_size=2)  # resolve and cache the session user
+
+        cursor = None
+        for depth in range(5):
+            params = {'page_size': 2, **({'cursor': cursor} if cursor else {})}
+            if depth in (0, 4):
+                # session, counts, page rows: no OFFSET scan, no per-row queries
+                with self.assertNumQueries(3) as queries:
+                    page = self.get_page(**params)
+                self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+            else:
+                page = self.get_page(**params)
+            self.assertEqual(len(page['users']), 2)
+            cursor = page['next_cursor']
+
+    def test_invalid_cursor(self):
+        for cursor in ('bm90IGEgY3Vyc29y', '%%%', 'MjAyNi0xMC0xOFQwMDowMDowMHx4'):
+            response = self.client.get(reverse('get_users_by_role'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': 'Invalid cursor.'})
+
+
+class UserQueryPlanTests(LocationTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(40):
+            User.objects.create_user(
+                f'uye{i}@example.com', first_name=f'Üye{i}', city='Ankara', ilce='Çankaya',
+                role='admin' if i % 10 == 0 else 'member',
+            )
+
+    def test_no_full_scans(self):
+        out = StringIO()
+        call_command('check_user_query_plans', verbosity=2, stdout=out)
+        # "ok  <label>: <plan>" for every query of every case
+        plans = {}
+        for line in out.getvalue().splitlines():
+            if line.startswith('ok '):
+                label, plan = line[3:].strip().split(': ', 1)
+                plans[label] = plans.get(label, '') + plan + '\n'
+        self.assertIn('members_user_created_idx', plans['get_users_by_role'])
+        self.assertIn('members_user_created_idx', plans['get_users_by_role cursor'])
+        self.assertIn('members_user_role_created_idx', plans['get_users_by_role role'])
+        self.assertIn('members_user_location_idx', plans['get_city_members district'])
+        self.assertIn('members_user_city_ilce_idx', plans['admin filter city'])
+        self.assertIn('members_user_ilce_idx', plans['admin filter ilce'])
+
+
+class CachedSessionUserTests(TestCase):
+    def setUp(self):
+        session_users.clear()
+        self.user = User.objects.create_user('uye@example.com', password='Gizli-sifre-123', first_name='Ayşe')
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        session_users.clear()
+
+    def assertWarmQueries(self, count):
+        for name in ('user_profile', 'user_detail'):
+            self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+            with self.assertNumQueries(count):
+                self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+
+    def test_warm_get_reads_only_the_session(self):
+        self.assertWarmQueries(1)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_warm_get_with_cached_sessions(self):
+        self.client.force_login(self.user)
+        self.assertWarmQueries(0)
+
+    def test_logout_invalidates(self):
+        self.client.get(reverse('user_profile'))
+        session_key = self.client.session.session_key
+        self.assertIsNotNone(session_users.get(session_key))
+
+        old_client = Client()
+        old_client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        self.assertEqual(self.client.post(reverse('logout')).status_code, 200)
+        self.assertIsNone(session_users.get(session_key))
+        # The old cookie no longer authenticates
+        self.assertEqual(old_client.get(reverse('user_profile')).status_code, 403)
+
+    def test_user_save_invalidates(self):
+        self.client.get(reverse('user_profile'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(session_users.get(self.client.session.session_key))
+        self.assertEqual(self.client.get(reverse('user_profile')).status_code, 403)
+
+
+class CachedTokenUserTests(TestCase):
+    def setUp(self):
+        token_users.clear()
+        self.user = User.objects.create_user('uye@example.com', password='Gizli-sifre-123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = Client(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_users.clear()
+
+    def get_statuses(self):
+        return [self.client.get(reverse(name)).status_code for name in ('user_detail', 'async_user_profile')]
+
+    def warm_up(self):
+        self.assertEqual(self.get_statuses(), [200, 200])
+        with self.assertNumQueries(0):
+            self.client.get(reverse('user_detail'))
+
+    def test_token_delete_invalidates(self):
+        self.warm_up()
+        self.token.delete()
+        self.assertIsNone(token_users.get(self.token.key))
+        self.assertEqual(self.get_statuses(), [403, 403])
+
+    def test_user_deactivation_invalidates(self):
+        self.warm_up()
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(token_users.get(self.token.key))
+        self.assertEqual(self.get_statuses(), [403, 403])
+
+    def test_delete_in_other_process_expires(self):
+        self.warm_up()
+        # A delete that sends no signal here, like one made by another worker
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM authtoken_token WHERE key = %s', [self.token.key])
+        self.assertEqual(self.get_statuses(), [200, 200])
+
+        later = time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL + 1
+        with mock.patch('members.user_cache.time.monotonic', return_value=later):
+            self.assertEqual(self.get_statuses(), [403, 403])
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('uye@example.com', password='Gizli-sifre-123')
+
+    def login(self, email, password):
+        return self.client.post(reverse('login'), {'email': email, 'password': password}, content_type='application/json')
+
+    def test_login(self):
+        self.assertEqual(self.login(' UYE@example.com ', 'Gizli-sifre-123').status_code, 200)
+        self.assertEqual(self.login('uye@example.com', 'yanlis-sifre').status_code, 401)
+        self.assertEqual(self.login('yok@example.com', 'Gizli-sifre-123').status_code, 401)
+
+    def test_outdated_hash_is_upgraded(self):
+        hasher = PBKDF2PasswordHasher()
+        outdated = hasher.encode('Gizli-sifre-123', hasher.salt(), iterations=1000)
+        User.objects.filter(pk=self.user.pk).update(password=outdated)
+        self.assertEqual(self.login('uye@example.com', 'Gizli-sifre-123').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.password, outdated)
+        self.assertTrue(self.user.check_password('Gizli-sifre-123'))
+
+
+REGISTRATION = {
+    'first_name': 'Ayşe',
+    'last_name': 'Yılmaz',
+    'email': 'ayse@example.com',
+    'phone': '05321234567',
+    'city': 'Ankara',
+    'ilce': 'Çankaya',
+    'mahalle': 'Kızılay',
+    'password': 'Gizli-sifre-123',
+    'confirm_password': 'Gizli-sifre-123',
+}
+
+
+class RegistrationTests(LocationTestCase):
+    def test_location_resolved_once_before_the_transaction(self):
+        get_location_tree()  # warm, like a running server
+        with mock.patch.object(User, 'resolve_location_refs', autospec=True,
+                               side_effect=User.resolve_location_refs) as resolve, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('register'), REGISTRATION, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(resolve.call_count, 1)
+        # Nothing but the insert and its receivers' writes inside the transaction
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertFalse(any('locationdataversion' in statement.lower() for statement in sql))
+        user = User.objects.get(email=REGISTRATION['email'])
+        self.assertEqual((user.city_ref_id, user.ilce_ref_id), (self.city.pk, self.district.pk))
+
+
+class RegistrationDuplicateTests(TestCase):
+    def setUp(self):
+        User.objects.create_user('ayse@example.com', phone='05321234567', first_name='Ayşe', last_name='Yılmaz')
+
+    def register(self, **changes):
+        return self.client.post(reverse('register'), {**REGISTRATION, **changes}, content_type='application/json')
+
+    def test_both_taken(self):
+        response = self.register()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'email', 'phone'})
+
+    def test_one_taken(self):
+        response = self.register(email='baska@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'phone'})
+
+        response = self.register(phone='05329999999')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'email'})
+
+        self.assertEqual(self.register(email='baska@example.com', phone='05329999999').status_code, 201)
+
+
+    def test_constraint_names(self):
+        def error(cause):
+            exc = IntegrityError(str(cause))
+            exc.__cause__ = cause
+            return exc
+
+        postgres = Exception('duplicate key value violates unique constraint')
+        postgres.diag = SimpleNamespace(constraint_name='members_user_phone_5f8a1c2e_uniq')
+        self.assertEqual(violated_unique_fields(error(postgres)), {'phone'})
+        postgres.diag.constraint_name = 'members_user_email_key'
+        self.assertEqual(violated_unique_fields(error(postgres)), {'email'})
+        mysql = Exception("(1062, \"Duplicate entry 'x' for key 'members_user.email'\")")
+        self.assertEqual(violated_unique_fields(error(mysql)), {'email'})
+        # Other constraints merely mentioning a field are not duplicates
+        other = Exception('FOREIGN KEY constraint failed on members_user_email_log')
+        self.assertIsNone(duplicate_field_errors(error(other), email='ayse@example.com'))
+
+
+class ImportMembersTests(LocationTestCase):
+    HEADER = ('first_name', 'last_name', 'email', 'phone', 'city', 'ilce', 'mahalle', 'password')
+
+    def setUp(self):
+        super().setUp()
+        Neighborhood.objects.create(district=self.district, name='Kızılay')
+        bump_location_version()
+        User.objects.create_user('kayitli@example.com', phone='05550000000')
+
+    def import_members(self, rows, header=HEADER, **options):
+        """Run import_members on a CSV of ``header`` rows; returns its output."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', newline='', delete=False) as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(rows)
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+        call_command('import_members', file=file.name, stdout=out, **options)
+        return out.getvalue()
+
+    def row(self, email, phone='', city='Ankara'):
+        return ('Ali', 'Veli', email, phone, city, 'Çankaya', 'Kızılay', 'Sifre.12345')
+
+    def test_missing_columns_fail_before_the_pool_starts(self):
+        with mock.patch('members.management.commands.import_members.ProcessPoolExecutor') as pool:
+            with self.assertRaisesMessage(CommandError, 'CSV is missing columns: mahalle, password'):
+                self.import_members([], header=self.HEADER[:-2])
+        pool.assert_not_called()
+
+    def test_dry_run_reports_row_errors(self):
+        rows = [
+            self.row('yeni@example.com', '05551111111'),
+            self.row('gecersiz'),
+            self.row('sehir@example.com', city='Atlantis'),
+            self.row('YENI@example.com'),
+            self.row('telefon@example.com', '05551111111'),
+            self.row('kayitli@example.com'),
+            self.row('kayitli-telefon@example.com', '05550000000'),
+        ]
+        with mock.patch('members.management.commands.import_members.ProcessPoolExecutor') as pool:
+            out = self.import_members(rows, dry_run=True)
+        pool.assert_not_called()
+
+        errors = [line for line in out.splitlines() if line.startswith('Row ')]
+        self.assertTrue(errors[0].startswith('Row 3: email: '))
+        self.assertEqual(errors[1:], [
+            'Row 4: city: Bilinmeyen şehir: Atlantis',
+            'Row 5: email: Bu e-posta adresi dosyada daha önce geçiyor',
+            'Row 6: phone: Bu telefon numarası dosyada daha önce geçiyor',
+            'Row 7: email: ' + DUPLICATE_ERRORS['email'],
+            'Row 8: phone: ' + DUPLICATE_ERRORS['phone'],
+        ])
+        self.assertIn('Rows read: 7', out)
+        self.assertIn('Failed: 6', out)
+        self.assertFalse(User.objects.filter(email='yeni@example.com').exists())
+
+    def test_import(self):
+        out = self.import_members([self.row('yeni@example.com', '05551111111'), self.row('kayitli@example.com')], workers=1)
+        self.assertIn('Imported: 1', out)
+        user = User.objects.get(email='yeni@example.com')
+        self.assertTrue(user.check_password('Sifre.12345'))
+        self.assertEqual((user.city_ref_id, user.ilce_ref_id), (self.city.pk, self.district.pk))
+        self.assertEqual(stored_rollup(MemberLocationRollup), compute_rollup(User))
+
+
+class ConcurrentRegistrationTests(TransactionTestCase):
+    def register_concurrently(self, payloads):
+        """POST every payload from its own thread, all inserting at the same time."""
+        inserting = threading.Barrier(len(payloads), timeout=30)
+
+        def wait_for_others(sender, instance, **kwargs):
+            # Every request has passed validation before any of them inserts
+            inserting.wait()
+
+        responses = [None] * len(payloads)
+
+        def register(index, payload):
+            try:
+                responses[index] = Client().post(reverse('register'), payload, content_type='application/json')
+            finally:
+                connection.close()
+
+        pre_save.connect(wait_for_others, sender=User, dispatch_uid='tests.wait_for_others')
+        try:
+            threads = [threading.Thread(target=register, args=item) for item in enumerate(payloads)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            pre_save.disconnect(sender=User, dispatch_uid='tests.wait_for_others')
+        return responses
+
+    def assertOneRegistered(self, responses, field):
+        self.assertEqual(sorted(response.status_code for response in responses), [201, 400])
+        rejected = next(response for response in responses if response.status_code == 400)
+        self.assertIn(field, rejected.json())
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_same_email(self):
+        responses = self.register_concurrently([
+            REGISTRATION,
+            {**REGISTRATION, 'phone': '05329999999'},
+        ])
+        self.assertOneRegistered(responses, 'email')
+
+    def test_same_phone(self):
+        responses = self.register_concurrently([
+            REGISTRATION,
+            {**REGISTRATION, 'email': 'baska@example.com'},
+        ])
+        self.assertOneRegistered(responses, 'phone')
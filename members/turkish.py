@@ -0,0 +1,54 @@
+# members/turkish.py
+"""
+Turkish text helpers: case mapping, folding and alphabetical sort key.
+
+Python's ``str.lower()`` maps ``I`` to ``i`` and sorts by code point, which
+puts Ç, Ğ, İ, Ö, Ş and Ü after Z. ``turkish_sort_key`` follows the Turkish
+alphabet (a b c ç d e f g ğ h ı i j k l m n o ö p r s ş t u ü v y z). The
+location models persist it in an indexed ``sort_key`` column, so the
+database returns Turkish order with a plain binary ``ORDER BY``.
+"""
+
+# Turkish alphabet plus q, w, x where they fall in the Latin alphabet
+TURKISH_ALPHABET = 'abcçdefgğhıijklmnoöpqrsştuüvwxyz'
+
+_LOWER_TABLE = str.maketrans({'I': 'ı', 'İ': 'i'})
+
+# Applied after turkish_lower(); every character maps to exactly one
+# character, so offsets in a folded string are offsets in the original.
+_FOLD_TABLE = str.maketrans({
+    'ç': 'c', 'ğ': 'g', 'ı': 'i', 'ö': 'o', 'ş': 's', 'ü': 'u',
+    'â': 'a', 'î': 'i', 'û': 'u',
+})
+
+# Letters map to consecutive private-use code points so that a plain string
+# comparison of two keys follows the Turkish alphabet. Circumflexed vowels
+# (â, î, û) sort with their base letter, as in Turkish dictionaries.
+_SORT_TABLE = str.maketrans({
+    **{letter: chr(0xE000 + rank) for rank, letter in enumerate(TURKISH_ALPHABET)},
+    'â': chr(0xE000 + TURKISH_ALPHABET.index('a')),
+    'î': chr(0xE000 + TURKISH_ALPHABET.index('i')),
+    'û': chr(0xE000 + TURKISH_ALPHABET.index('u')),
+})
+
+
+def turkish_lower(text):
+    """Lowercase with Turkish rules (I -> ı, İ -> i)."""
+    return text.translate(_LOWER_TABLE).lower()
+
+
+def turkish_fold(text):
+    """
+    Case- and diacritic-insensitive form for matching.
+
+    ``I``, ``İ``, ``ı`` and ``i`` all fold to ``i``; ç, ğ, ö, ş, ü lose their
+    marks. The result has the same length as ``text``.
+    """
+    return turkish_lower(text).translate(_FOLD_TABLE)
+
+
+def turkish_sort_key(text):
+    """Key for sorting strings in Turkish alphabetical order, ignoring case."""
+    if not text:
+        return ''
+    return turkish_lower(text).translate(_SORT_TABLE)
@@ -2,6 +2,7 @@
 from django.urls import path
 from . import views
 from . import location_views
+from . import async_views
 
 urlpatterns = [
     # CSRF token endpoint
@@ -24,10 +25,31 @@ urlpatterns = [
     # Keep your existing endpoint for backward compatibility
     path('user/', views.user_detail, name='user_detail'),
     path('users/by-city/', views.get_users_by_city, name='get_users_by_city'),
+    path('users/by-city/members/', views.get_city_members, name='get_city_members'),
+    path('users/search/', views.search_members, name='search_members'),
     
     # Location endpoints
     path('locations/cities/', location_views.get_cities, name='get_cities'),
     path('locations/districts/<str:city_name>/', location_views.get_districts, name='get_districts'),
     path('locations/neighborhoods/<str:city_name>/<str:district_name>/', location_views.get_neighborhoods, name='get_neighborhoods'),
     path('locations/all/', location_views.get_all_locations, name='get_all_locations'),
-]
\ No newline at end of file
+    path('locations/search/', location_views.search_locations, name='search_locations'),
+    path('locations/export/', location_views.export_locations, name='export_locations'),
+
+    # ID-based location endpoints
+    path('v2/locations/cities/', location_views.get_cities_v2, name='get_cities_v2'),
+    path('v2/locations/cities/<int:city_id>/districts/', location_views.get_districts_v2, name='get_districts_v2'),
+    path('v2/locations/districts/<int:district_id>/neighborhoods/', location_views.get_neighborhoods_v2, name='get_neighborhoods_v2'),
+
+    # Async variants of the read endpoints for ASGI deployments (saha_api/asgi.py)
+    path('async/user/profile/', async_views.auser_profile, name='async_user_profile'),
+    path('async/users/by-city/', async_views.aget_users_by_city, name='async_get_users_by_city'),
+    path('async/locations/cities/', async_views.aget_cities, name='async_get_cities'),
+    path('async/locations/districts/<str:city_name>/', async_views.aget_districts, name='async_get_districts'),
+    path('async/locations/neighborhoods/<str:city_name>/<str:district_name>/', async_views.aget_neighborhoods, name='async_get_neighborhoods'),
+    path('async/locations/all/', async_views.aget_all_locations, name='async_get_all_locations'),
+    path('async/locations/search/', async_views.asearch_locations, name='async_search_locations'),
+    path('async/v2/locations/cities/', async_views.aget_cities_v2, name='async_get_cities_v2'),
+    path('async/v2/locations/cities/<int:city_id>/districts/', async_views.aget_districts_v2, name='async_get_districts_v2'),
+    path('async/v2/locations/districts/<int:district_id>/neighborhoods/', async_views.aget_neighborhoods_v2, name='async_get_neighborhoods_v2'),
+]
@@ -0,0 +1,84 @@
+# members/user_cache.py
+"""
+Per-process caches of authenticated users.
+
+``session_users`` backs ``CachedAuthenticationMiddleware`` (keyed by session
+key) and ``token_users`` backs ``CachedTokenAuthentication`` (keyed by token
+key). Both are bounded LRUs whose entries also expire after a TTL, so rows
+changed by another process or by writes that send no signals are picked up
+within ``AUTH_USER_CACHE_TTL`` seconds (``AUTH_TOKEN_CACHE_TTL`` for tokens).
+``members/signals.py`` drops a user's entries as soon as the user is saved or
+deleted in this process.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class UserCache:
+    """Thread-safe LRU of {key: (user id, tag, expires, value)}."""
+
+    def __init__(self, ttl_setting='AUTH_USER_CACHE_TTL', default_ttl=60):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._ttl_setting = ttl_setting
+        self._default_ttl = default_ttl
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024)
+
+    @property
+    def ttl(self):
+        return getattr(settings, self._ttl_setting, self._default_ttl)
+
+    def get(self, key):
+        """
+        (tag, value) stored under ``key``, or None if missing or expired.
+
+        ``value`` is a copy: views may modify request.user, and the cached
+        instance is shared between threads.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            _, tag, expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return tag, copy.copy(value)
+
+    def set(self, key, user_id, tag, value, ttl=None):
+        """Cache ``value`` for at most ``ttl`` seconds (default: the cache TTL)."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if not self.max_size or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (str(user_id), tag, time.monotonic() + ttl, copy.copy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def forget(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def forget_user(self, user_id):
+        """Drop every entry of ``user_id``."""
+        user_id = str(user_id)
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+session_users = UserCache()
+token_users = UserCache('AUTH_TOKEN_CACHE_TTL', 5)
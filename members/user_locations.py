@@ -0,0 +1,219 @@
+# members/user_locations.py
+"""
+Mapping of the free-text ``User.city`` / ``ilce`` / ``mahalle`` values to
+``City`` / ``District`` / ``Neighborhood`` rows.
+
+An exact (whitespace-trimmed) match wins; otherwise names are compared in
+their ``turkish_fold`` form with whitespace collapsed, so "istanbul ",
+"İSTANBUL" and "İstanbul" all resolve to the same city.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+
+from .member_rollup import stored_rollup_keys
+from .turkish import turkish_fold
+
+BACKFILL_CHUNK_SIZE = 1000
+# Scopes OR-ed into one query, and IDs per IN list
+SCOPE_CHUNK_SIZE = 200
+
+
+def _fold(name):
+    return ' '.join(turkish_fold(name).split()) if name else ''
+
+
+def _index(pairs):
+    """{key: id} over (parent, name) pairs, exact names first, folded names as fallback."""
+    exact = {}
+    folded = {}
+    for parent, name, pk in pairs:
+        exact[(parent, name)] = pk
+        folded.setdefault((parent, _fold(name)), pk)
+    return exact, folded
+
+
+class LocationResolver:
+    """In-memory folded-name -> ID lookup over the location hierarchy."""
+
+    def __init__(self, city_rows, district_rows, neighborhood_rows):
+        # Same shapes as LocationTree: ((id, name), ...) and {parent_id: ((id, name), ...)}
+        self._cities = _index((None, name, city_id) for city_id, name in city_rows)
+        self._districts = _index(
+            (city_id, name, district_id)
+            for city_id, rows in district_rows.items()
+            for district_id, name in rows
+        )
+        self._neighborhoods = _index(
+            (district_id, name, neighborhood_id)
+            for district_id, rows in neighborhood_rows.items()
+            for neighborhood_id, name in rows
+        )
+
+    @classmethod
+    def from_models(cls, City, District, Neighborhood):
+        """Build from (possibly historical) models with one query per table."""
+        district_rows = {}
+        for district_id, city_id, name in District.objects.values_list('id', 'city_id', 'name'):
+            district_rows.setdefault(city_id, []).append((district_id, name))
+        neighborhood_rows = {}
+        for neighborhood_id, district_id, name in Neighborhood.objects.values_list('id', 'district_id', 'name').iterator(chunk_size=5000):
+            neighborhood_rows.setdefault(district_id, []).append((neighborhood_id, name))
+        return cls(City.objects.values_list('id', 'name'), district_rows, neighborhood_rows)
+
+    @staticmethod
+    def _lookup(index, parent, name):
+        if not name:
+            return None
+        exact, folded = index
+        pk = exact.get((parent, name.strip()))
+        if pk is None:
+            pk = folded.get((parent, _fold(name)))
+        return pk
+
+    def resolve(self, city, ilce, mahalle):
+        """Return (city_id, district_id, neighborhood_id); unknown levels are None."""
+        city_id = self._lookup(self._cities, None, city)
+        district_id = self._lookup(self._districts, city_id, ilce) if city_id else None
+        neighborhood_id = self._lookup(self._neighborhoods, district_id, mahalle) if district_id else None
+        return city_id, district_id, neighborhood_id
+
+
+REF_FIELDS = ('city_ref', 'ilce_ref', 'mahalle_ref')
+_REF_ATTNAMES = ('city_ref_id', 'ilce_ref_id', 'mahalle_ref_id')
+
+
+def _update_refs(User, resolver, rows):
+    """
+    Write the refs of the (pk, city, ilce, mahalle, *refs) ``rows`` that
+    resolve differently; returns how many were written.
+    """
+    changed = []
+    for pk, city, ilce, mahalle, *current in rows:
+        resolved = resolver.resolve(city, ilce, mahalle)
+        if tuple(current) != resolved:
+            changed.append(User(pk=pk, **dict(zip(_REF_ATTNAMES, resolved))))
+    if changed:
+        with transaction.atomic():
+            User.objects.bulk_update(changed, REF_FIELDS)
+    return len(changed)
+
+
+def resolve_user_locations(User, resolver, pks, chunk_size=BACKFILL_CHUNK_SIZE):
+    """Re-resolve the location refs of users ``pks``; returns how many changed."""
+    pks = sorted(pks)
+    updated = 0
+    for start in range(0, len(pks), chunk_size):
+        rows = User.objects.filter(pk__in=pks[start:start + chunk_size]).values_list(
+            'pk', 'city', 'ilce', 'mahalle', *REF_FIELDS
+        )
+        updated += _update_refs(User, resolver, rows)
+    return updated
+
+
+class LocationChanges:
+    """
+    The members a set of location writes may affect.
+
+    Each ``add_*`` call records the members whose refs a write to one row
+    can change: those pointing at the row, and those left unresolved under
+    its parent (a new or renamed row may now match their text). City and
+    district writes also change map rollup keys, so the rollup keys of
+    those members are read before the write and kept in ``previous_keys``.
+    Deleted rows need no special case: SET_NULL leaves their members
+    unresolved under the parent.
+
+    ``members/signals.py`` builds one per location row write and applies it
+    after commit; ``load_locations`` builds them for the writes that send no
+    signals. Changes of one batch are merged into one.
+    """
+
+    def __init__(self):
+        self.scopes = []
+        self.previous_keys = {}
+
+    def __bool__(self):
+        return bool(self.scopes)
+
+    def _add(self, User, scope, snapshot):
+        self.scopes.append(scope)
+        if snapshot:
+            pks = [pk for pk in User.objects.filter(scope).values_list('pk', flat=True)
+                   if pk not in self.previous_keys]
+            self.previous_keys.update(stored_rollup_keys(User, pks))
+        return self
+
+    def add_city(self, User, city_id=None):
+        """A city was (or is about to be) created, renamed or deleted."""
+        scope = Q(city_ref__isnull=True)
+        if city_id is not None:
+            scope |= Q(city_ref=city_id)
+        return self._add(User, scope, snapshot=True)
+
+    def add_district(self, User, city_id, district_id=None):
+        """A district of ``city_id`` was (or is about to be) created, renamed or deleted."""
+        scope = Q(city_ref=city_id, ilce_ref__isnull=True)
+        if district_id is not None:
+            scope |= Q(ilce_ref=district_id)
+        return self._add(User, scope, snapshot=True)
+
+    def add_neighborhood(self, district_id, neighborhood_id=None):
+        """A neighborhood of ``district_id`` changed; rollup keys do not depend on it."""
+        scope = Q(ilce_ref=district_id, mahalle_ref__isnull=True)
+        if neighborhood_id is not None:
+            scope |= Q(mahalle_ref=neighborhood_id)
+        return self._add(None, scope, snapshot=False)
+
+    def add_neighborhoods(self, district_ids):
+        """Neighborhoods were inserted into ``district_ids`` (e.g. with bulk_create)."""
+        district_ids = sorted(set(district_ids))
+        for start in range(0, len(district_ids), SCOPE_CHUNK_SIZE):
+            scope = Q(ilce_ref__in=district_ids[start:start + SCOPE_CHUNK_SIZE], mahalle_ref__isnull=True)
+            self._add(None, scope, snapshot=False)
+        return self
+
+    def merge(self, other):
+        """Add ``other``'s members; keys read earlier win."""
+        self.scopes += other.scopes
+        for pk, key in other.previous_keys.items():
+            self.previous_keys.setdefault(pk, key)
+        return self
+
+    def user_pks(self, User):
+        """IDs of every member in scope now (after the writes), and of those snapshotted before."""
+        pks = set(self.previous_keys)
+        for start in range(0, len(self.scopes), SCOPE_CHUNK_SIZE):
+            scope = reduce(or_, self.scopes[start:start + SCOPE_CHUNK_SIZE])
+            pks.update(User.objects.filter(scope).values_list('pk', flat=True))
+        return pks
+
+
+def backfill_user_locations(User, resolver, chunk_size=BACKFILL_CHUNK_SIZE, stdout=None):
+    """
+    Set the location foreign keys of users from their text fields.
+
+    Walks users in primary-key order, ``chunk_size`` rows at a time, and
+    commits each chunk separately. Only rows whose foreign keys differ from
+    the resolved IDs are written, so an interrupted run keeps its progress
+    and a restarted one only reads the rows it already handled.
+    Returns (scanned, updated).
+    """
+    scanned = updated = 0
+    last_id = 0
+    while True:
+        rows = list(
+            User.objects.filter(pk__gt=last_id)
+            .order_by('pk')
+            .values_list('pk', 'city', 'ilce', 'mahalle', *REF_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        scanned += len(rows)
+        updated += _update_refs(User, resolver, rows)
+        if stdout is not None:
+            stdout.write(f'Scanned {scanned} users, updated {updated} (last id {last_id})')
+
+    return scanned, updated
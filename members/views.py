@@ -1,19 +1,59 @@
 # members/views.py
 
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout, get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
+from django.db.models.functions import Trim
 from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from rest_framework.permissions import IsAuthenticated
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
 from django.middleware.csrf import get_token
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from .serializers import UserRegistrationSerializer, UserUpdateSerializer, ChangePasswordSerializer
+from .location_cache import get_location_tree
+from .member_rollup import is_istanbul, map_counts
+from .member_search import TEXT_FIELDS, build_snippet, query_terms, search_member_ids, search_supported
+from .models import MemberLocationRollup
+from .representations import DETAIL, LOGIN, MAP_MEMBER, MEMBER_SEARCH, PROFILE, PROFILE_UPDATE, ROLE_CHANGE, USER_LIST
+from datetime import datetime
+import base64
 import json
 
 User = get_user_model()
 
+# Page size limits for the paginated user lists
+MEMBERS_PAGE_SIZE = 50
+MEMBERS_MAX_PAGE_SIZE = 200
+
+
+def parse_page_size(request):
+    """?page_size= clamped to 1..MEMBERS_MAX_PAGE_SIZE"""
+    try:
+        page_size = int(request.GET.get('page_size', MEMBERS_PAGE_SIZE))
+    except ValueError:
+        page_size = MEMBERS_PAGE_SIZE
+    return max(1, min(page_size, MEMBERS_MAX_PAGE_SIZE))
+
+
+def encode_user_cursor(row):
+    """Opaque cursor pointing just after a (created_at, id) row"""
+    raw = f"{row['created_at'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_user_cursor(cursor):
+    """(created_at, id) from encode_user_cursor; ValueError if malformed"""
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    created_at, user_id = raw.split('|')
+    return datetime.fromisoformat(created_at), int(user_id)
+
 
 @api_view(['GET'])
 @ensure_csrf_cookie
@@ -39,30 +79,15 @@ def login_view(request):
         # Clean email
         email = email.strip().lower()
 
-        # Try to find user by email
-        try:
-            user_obj = User.objects.get(email=email)
-        except User.DoesNotExist:
-            return Response({
-                'success': False,
-                'error': 'Geçersiz e-posta veya şifre'
-            }, status=status.HTTP_401_UNAUTHORIZED)
+        # One lookup by email; unknown emails cost the same hashing time
+        user = authenticate(request, email=email, password=password)
 
-        # Authenticate using email as username
-        user = authenticate(request, username=email, password=password)
-
-        if user is not None and user.is_active:
+        if user is not None:
             login(request, user)
             return Response({
                 'success': True,
                 'message': 'Giriş başarılı',
-                'user': {
-                    'id': user.id,
-                    'email': user.email,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'role': user.role
-                }
+                'user': LOGIN.instance(user)
             }, status=status.HTTP_200_OK)
         else:
             return Response({
@@ -87,21 +112,57 @@ def logout_view(request):
     }, status=status.HTTP_200_OK)
 
 
+def representation_version(user):
+    """Changes on every save of the user (updated_at is auto_now)"""
+    return f'{user.pk}-{int(user.updated_at.timestamp() * 1_000_000)}'
+
+
+def representation_etag(kind, user):
+    return f'"{kind}-{representation_version(user)}"'
+
+
+def representation_key(kind, user):
+    return f'members:{kind}:{representation_version(user)}'
+
+
+def cached_representation(kind, user, build):
+    """
+    ``build(user)``, cached under (user.id, user.updated_at).
+
+    Every save bumps updated_at, so an edited profile is never served from
+    an old entry; stale entries simply expire.
+    """
+    key = representation_key(kind, user)
+    data = cache.get(key)
+    if data is None:
+        data = build(user)
+        cache.set(key, data, getattr(settings, 'PROFILE_CACHE_TIMEOUT', 3600))
+    return data
+
+
+def representation_headers(response, etag):
+    """ETag plus headers that keep per-user responses out of shared caches."""
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie', 'Authorization'))
+    return response
+
+
+def representation_response(request, kind, build):
+    """304 on a matching If-None-Match, otherwise the cached representation."""
+    user = request.user
+    etag = representation_etag(kind, user)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = Response(cached_representation(kind, user, build))
+    return representation_headers(response, etag)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_detail(request):
     """Get current user details"""
-    user = request.user
-    return Response({
-        'first_name': user.first_name,
-        'last_name': user.last_name,
-        'city': getattr(user, 'city', ''),
-        'ilce': getattr(user, 'ilce', ''),
-        'mahalle': getattr(user, 'mahalle', ''),
-        'phone': getattr(user, 'phone', ''),
-        'email': user.email,
-        'role': getattr(user, 'role', None),
-    })
+    return representation_response(request, 'detail', DETAIL.instance)
 
 
 @api_view(['POST'])
@@ -125,6 +186,7 @@ def register_user(request):
     city = request.data.get('city', '').strip()
     ilce = request.data.get('ilce', '').strip()
     mahalle = request.data.get('mahalle', '').strip()
+    finansal_kod_numarasi = str(request.data.get('finansal_kod_numarasi', '1')).strip()
     password = request.data.get('password', '')
     confirm_password = request.data.get('confirm_password', '')
     role = request.data.get('role', 'member')
@@ -143,15 +205,13 @@ def register_user(request):
     elif len(last_name) < 2:
         errors['last_name'] = ['Soyad en az 2 karakter olmalıdır']
 
+    # Duplicate email/phone is reported by the serializer when the insert
+    # hits the unique constraints
     if not email:
         errors['email'] = ['E-posta adresi gereklidir']
-    elif User.objects.filter(email=email).exists():
-        errors['email'] = ['Bu e-posta adresi ile kayıtlı bir kullanıcı zaten mevcut']
 
     if not phone:
         errors['phone'] = ['Telefon numarası gereklidir']
-    elif User.objects.filter(phone=phone).exists():
-        errors['phone'] = ['Bu telefon numarası ile kayıtlı bir kullanıcı zaten mevcut']
 
     if not city:
         errors['city'] = ['Şehir bilgisi gereklidir']
@@ -189,6 +249,7 @@ def register_user(request):
             'city': city,
             'ilce': ilce,
             'mahalle': mahalle,
+            'finansal_kod_numarasi': finansal_kod_numarasi,
             'password': password,
             'confirm_password': confirm_password,
             'role': role
@@ -197,7 +258,10 @@ def register_user(request):
         # Use serializer for final validation and creation
         serializer = UserRegistrationSerializer(data=serializer_data)
         if serializer.is_valid():
-            user = serializer.save()
+            try:
+                user = serializer.save()
+            except ValidationError as exc:
+                return Response(exc.detail, status=status.HTTP_400_BAD_REQUEST)
             return Response({
                 'success': True,
                 'message': 'User registered successfully',
@@ -219,30 +283,7 @@ def register_user(request):
 @permission_classes([IsAuthenticated])
 def user_profile(request):
     """Get current user's profile"""
-    user = request.user
-    return Response({
-        'id': user.id,
-        'first_name': user.first_name,
-        'last_name': user.last_name,
-        'username': f"{user.first_name} {user.last_name}".strip(),
-        'city': user.city,
-        'ilce': getattr(user, 'ilce', ''),
-        'mahalle': getattr(user, 'mahalle', ''),
-        'finansal_kod_numarasi': getattr(user, 'finansal_kod_numarasi', ''),
-        'phone': getattr(user, 'phone', ''),
-        'email': user.email,
-    'meslegim': getattr(user, 'meslegim', ''),
-    'ilgi_alanlarim': getattr(user, 'ilgi_alanlarim', ''),
-        'yeteneklerim': getattr(user, 'yeteneklerim', ''),
-        'hobilerim': getattr(user, 'hobilerim', ''),
-        'role': user.role,
-        'role_display': user.get_role_display(),
-        'is_superadmin': user.is_superadmin,
-        'is_admin': user.is_admin,
-        'is_member': user.is_member,
-        'has_admin_privileges': user.has_admin_privileges(),
-        'created_at': user.created_at,
-    })
+    return representation_response(request, 'profile', PROFILE.instance)
 
 
 @api_view(['PUT'])
@@ -275,24 +316,7 @@ def update_user_profile(request):
         updated_user = serializer.save()
         return Response({
             'message': 'Profile updated successfully',
-            'user': {
-                'id': updated_user.id,
-                'first_name': updated_user.first_name,
-                'last_name': updated_user.last_name,
-                'username': f"{updated_user.first_name} {updated_user.last_name}".strip(),
-                'city': updated_user.city,
-                'ilce': getattr(updated_user, 'ilce', ''),
-                'mahalle': getattr(updated_user, 'mahalle', ''),
-                'finansal_kod_numarasi': getattr(updated_user, 'finansal_kod_numarasi', ''),
-                'phone': getattr(updated_user, 'phone', ''),
-                'email': updated_user.email,
-                'meslegim': getattr(updated_user, 'meslegim', ''),
-                'ilgi_alanlarim': getattr(updated_user, 'ilgi_alanlarim', ''),
-                'yeteneklerim': getattr(updated_user, 'yeteneklerim', ''),
-                'hobilerim': getattr(updated_user, 'hobilerim', ''),
-                'role': updated_user.role,
-                'role_display': updated_user.get_role_display(),
-            }
+            'user': PROFILE_UPDATE.instance(updated_user)
         }, status=status.HTTP_200_OK)
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -327,81 +351,95 @@ def get_users_by_role(request):
         )
 
     role_filter = request.GET.get('role', None)
+    page_size = parse_page_size(request)
 
-    if role_filter:
-        users = User.objects.filter(role=role_filter)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            after = decode_user_cursor(cursor)
+        except ValueError:
+            return Response(
+                {'error': 'Invalid cursor.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
     else:
-        users = User.objects.all()
+        after = None
 
-    users_data = []
-    for user in users:
-        users_data.append({
-            'id': user.id,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'username': f"{user.first_name} {user.last_name}".strip(),
-            'city': user.city,
-            'ilce': getattr(user, 'ilce', ''),
-            'mahalle': getattr(user, 'mahalle', ''),
-            'phone': getattr(user, 'phone', ''),
-            'email': user.email,
-            'role': user.role,
-            'role_display': user.get_role_display(),
-            'created_at': user.created_at,
-            'is_active': user.is_active,
-        })
+    users = User.objects.all()
+    if role_filter:
+        users = users.filter(role=role_filter)
+
+    # Role counts and the filtered total in a single aggregate query
+    counts = User.objects.aggregate(
+        total=Count('id', filter=Q(role=role_filter) if role_filter else None),
+        **{
+            role: Count('id', filter=Q(role=role))
+            for role, _ in User.ROLE_CHOICES
+        }
+    )
+
+    # Keyset pagination on (created_at, id): each page is an index range scan
+    # no matter how deep it is
+    if after is not None:
+        created_at, user_id = after
+        # created_at__gte gives the index a range start; the OR only breaks ties
+        users = users.filter(
+            Q(created_at__gte=created_at),
+            Q(created_at__gt=created_at) | Q(id__gt=user_id)
+        )
+    rows = list(
+        users.order_by('created_at', 'id').values(*USER_LIST.fields)[:page_size + 1]
+    )
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
 
     return Response({
-        'users': users_data,
-        'total_count': len(users_data),
-        'role_counts': {
-            'superadmin': User.objects.filter(role='superadmin').count(),
-            'admin': User.objects.filter(role='admin').count(),
-            'member': User.objects.filter(role='member').count(),
-        }
+        'users': USER_LIST.rows(rows),
+        'total_count': counts.pop('total'),
+        'page_size': page_size,
+        'has_next': has_next,
+        'next_cursor': encode_user_cursor(rows[-1]) if has_next else None,
+        'role_counts': counts
     })
 
 
+# Columns read by group_map_members
+MAP_MEMBER_FIELDS = ('city', 'ilce') + MAP_MEMBER.fields
+
+
+def group_map_members(users):
+    """Group user rows by city (by district for İstanbul) for the map"""
+    city_users = {}
+
+    for user in users:
+        city = user['city'].strip() if user['city'] else ''
+        ilce = user['ilce'].strip() if user['ilce'] else ''
+
+        if not city:
+            continue
+
+        # For Istanbul, group by district (ilce); other cities by city
+        key = ilce if is_istanbul(city) and ilce else city
+        city_users.setdefault(key, []).append(MAP_MEMBER.row(user))
+
+    return city_users
+
+
 @api_view(['GET'])
 def get_users_by_city(request):
-    """Get users grouped by city for map display"""
+    """
+    Get users grouped by city for map display.
+
+    ?mode=counts returns only the number of active members per city (per
+    district for İstanbul), read from the MemberLocationRollup table.
+    """
+    if request.GET.get('mode') == 'counts':
+        return get_user_counts_by_city()
+
     try:
         # Get all users with their cities and districts
-        users = User.objects.filter(is_active=True).values('first_name', 'last_name', 'city', 'ilce', 'role')
-
-        # Group users by city and district
-        city_users = {}
-
-        for user in users:
-            city = user['city'].strip() if user['city'] else ''
-            ilce = user['ilce'].strip() if user['ilce'] else ''
-            
-            if not city:
-                continue
-
-            full_name = f"{user['first_name']} {user['last_name']}".strip()
-
-            # For Istanbul, group by district (ilce)
-            # Use Turkish locale-aware comparison for Istanbul
-            city_lower = city.replace('İ', 'i').replace('I', 'ı').lower()
-            if city_lower == 'istanbul' and ilce:
-                # Use district as the key for Istanbul
-                if ilce not in city_users:
-                    city_users[ilce] = []
-                
-                city_users[ilce].append({
-                    'name': full_name,
-                    'role': user['role']
-                })
-            else:
-                # For other cities, group by city
-                if city not in city_users:
-                    city_users[city] = []
-
-                city_users[city].append({
-                    'name': full_name,
-                    'role': user['role']
-                })
+        users = User.objects.filter(is_active=True).values(*MAP_MEMBER_FIELDS)
+        city_users = group_map_members(users)
 
         return Response({
             'success': True,
@@ -417,6 +455,172 @@ def get_users_by_city(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def get_user_counts_by_city():
+    """
+    Member counts per map key, read from the MemberLocationRollup table.
+
+    The rollup is kept current by the User signals, so this reads one row per
+    (city, district, role) instead of counting members.
+    """
+    try:
+        counts = map_counts(MemberLocationRollup)
+
+        return Response({
+            'success': True,
+            'mode': 'counts',
+            'data': counts,
+            'total_cities': len(counts),
+            'total_users': sum(counts.values())
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': 'Kullanıcı verileri alınırken hata oluştu'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+def get_city_members(request):
+    """
+    Paginated active members of one city, or one district of it (map drill-down).
+
+    Query parameters: city (required), district, page, page_size.
+    """
+    city = request.GET.get('city', '').strip()
+    district = request.GET.get('district', '').strip()
+    if not city:
+        return Response({
+            'success': False,
+            'error': 'Şehir bilgisi gereklidir'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    page_size = parse_page_size(request)
+
+    try:
+        users = User.objects.filter(is_active=True)
+
+        # Known locations are matched on the indexed foreign keys; anything
+        # else falls back to the trimmed text of users that have no match.
+        city_id, district_id, _ = get_location_tree().resolver().resolve(city, district, None)
+        if city_id:
+            users = users.filter(city_ref_id=city_id)
+        else:
+            users = users.annotate(city_trim=Trim('city')).filter(city_ref__isnull=True, city_trim=city)
+        if district:
+            if district_id:
+                users = users.filter(ilce_ref_id=district_id)
+            else:
+                users = users.annotate(ilce_trim=Trim('ilce')).filter(ilce_ref__isnull=True, ilce_trim=district)
+
+        users = users.values(*MAP_MEMBER.fields).order_by('first_name', 'last_name', 'id')
+        page = Paginator(users, page_size).get_page(request.GET.get('page'))
+
+        return Response({
+            'success': True,
+            'city': city,
+            'district': district or None,
+            'members': MAP_MEMBER.rows(page),
+            'page': page.number,
+            'page_size': page_size,
+            'total': page.paginator.count,
+            'has_next': page.has_next()
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': 'Kullanıcı verileri alınırken hata oluştu'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_members(request):
+    """
+    Member directory search over names and profile texts, best match first.
+
+    Query parameters: q (required), city, district, role, page, page_size.
+    See members/member_search.py.
+    """
+    query = request.GET.get('q', '').strip()
+    terms = query_terms(query)
+    if not terms:
+        return Response({
+            'success': False,
+            'error': 'Arama metni (q) gereklidir'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    city = request.GET.get('city', '').strip()
+    district = request.GET.get('district', '').strip()
+    role = request.GET.get('role', '').strip()
+    if district and not city:
+        return Response({
+            'success': False,
+            'error': 'İlçe ile birlikte şehir bilgisi gereklidir'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not search_supported():
+        return Response({
+            'success': False,
+            'error': 'Üye arama bu veritabanında desteklenmiyor'
+        }, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    page_size = parse_page_size(request)
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    try:
+        # Same location matching as get_city_members: foreign keys for known
+        # locations, trimmed text for users that have no match
+        filters = []
+        if city:
+            city_id, district_id, _ = get_location_tree().resolver().resolve(city, district, None)
+            if city_id:
+                filters.append(('u.city_ref_id = %s', [city_id]))
+            else:
+                filters.append(('u.city_ref_id IS NULL AND TRIM(u.city) = %s', [city]))
+            if district:
+                if district_id:
+                    filters.append(('u.ilce_ref_id = %s', [district_id]))
+                else:
+                    filters.append(('u.ilce_ref_id IS NULL AND TRIM(u.ilce) = %s', [district]))
+        if role:
+            filters.append(('u.role = %s', [role]))
+
+        ids = search_member_ids(terms, filters, limit=page_size + 1, offset=(page - 1) * page_size)
+        has_next = len(ids) > page_size
+        ids = ids[:page_size]
+
+        rows = {
+            row['id']: row
+            for row in User.objects.filter(id__in=ids).values(*MEMBER_SEARCH.fields, *TEXT_FIELDS)
+        }
+        results = []
+        for user_id in ids:
+            row = rows[user_id]
+            result = MEMBER_SEARCH.row(row)
+            result['snippet'] = build_snippet(row, terms)
+            results.append(result)
+
+        return Response({
+            'success': True,
+            'query': query,
+            'results': results,
+            'page': page,
+            'page_size': page_size,
+            'has_next': has_next
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': 'Arama sırasında bir hata oluştu'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def change_user_role(request, user_id):
@@ -467,11 +671,5 @@ def change_user_role(request, user_id):
 
     return Response({
         'message': f'User role changed from {old_role} to {new_role}',
-        'user': {
-            'id': user.id,
-            'email': user.email,
-            'username': f"{user.first_name} {user.last_name}".strip(),
-            'role': user.role,
-            'role_display': user.get_role_display(),
-        }
+        'user': ROLE_CHANGE.instance(user)
     }, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -46,16 +46,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-
+    'members.middleware.CachedAuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 ROOT_URLCONF = 'saha_api.urls'
 
@@ -82,9 +78,54 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / "db.sqlite3",
+        # A file rather than the default shared-cache in-memory database:
+        # the concurrent registration tests need SQLite's file locking, which
+        # waits for a busy writer instead of failing with "table is locked"
+        'TEST': {
+            'NAME': BASE_DIR / "test_db.sqlite3",
+        },
     }
 }
 
+# Per process: each worker has its own copy
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'saha-api',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# Sessions are read from the database (one query per request). Only switch to
+# cached_db together with a cache every worker shares: with LocMemCache a
+# logout in one worker leaves the session alive in the other workers' caches.
+#
+#   CACHES = {'default': {
+#       'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#       'LOCATION': 'redis://127.0.0.1:6379/1',
+#   }}
+#   SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+# Users resolved from sessions and tokens, kept per process (see members/user_cache.py).
+# Saves and deletes drop them only in the process that made them, so run one
+# application process per host (scale with threads), or accept that other
+# processes serve the old user for up to AUTH_USER_CACHE_TTL.
+AUTH_USER_CACHE_SIZE = 1024
+# Seconds a cached user may be served before it is reloaded
+AUTH_USER_CACHE_TTL = 60
+# Same for token-authenticated users. Short, because it is also how long
+# another process keeps accepting a deleted token (or a deactivated user's):
+# a warm client still skips the token query for all but one request per
+# interval.
+AUTH_TOKEN_CACHE_TTL = 5
+# Seconds a cached user_profile / user_detail representation is kept
+PROFILE_CACHE_TIMEOUT = 3600
+# Seconds an API token stays valid after it is created (None: no expiry)
+AUTH_TOKEN_EXPIRY = None
+
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',  # your React frontend
@@ -97,15 +138,32 @@ CSRF_TRUSTED_ORIGINS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'members.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # orjson when installed, stdlib json otherwise (see members/fast_json.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'members.fast_json.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'members.fast_json.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 AUTH_USER_MODEL = 'members.User'
 
+AUTHENTICATION_BACKENDS = [
+    'members.backends.EmailBackend',
+]
+
+# Logins hashing passwords concurrently per process (default: one per CPU)
+PASSWORD_HASH_WORKERS = None
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -157,6 +215,14 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Location data caching
+# Seconds between re-reads of the location dataset version stamp per process
+LOCATION_VERSION_CHECK_INTERVAL = 5
+# Cache-Control max-age (seconds) for /api/locations/* responses
+LOCATION_CACHE_MAX_AGE = 3600
+# Precompressed location payloads written by `manage.py compress_locations`
+LOCATION_PAYLOAD_DIR = BASE_DIR / 'location_payloads'
+
 
 
 